@@ -1,8 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+import hmac
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from ml_model import HealthRecommendationModel
+from auth import bearer_token, verify_hs256
+from cache import LRUCache
+from ml_model import split_value
+from model_registry import ModelRegistry
+from recommendations import RecommendationStore
+from database import get_engine
+from content import ContentStore
+from history_writer import HistoryWriter
+from search_index import SearchIndex
+import metrics
 
 # Load environment variables
 load_dotenv()
@@ -10,9 +22,116 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize and load the model
-model = HealthRecommendationModel()
-model_loaded = False
+MODEL_PATH = os.environ.get("MODEL_PATH", "model.joblib")
+DATASET_PATH = os.environ.get("DATASET_PATH", "dataset_penyakit_10000_cleaned.csv")
+MAX_TOP_K = 10
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 50
+MAX_RELATED_CONDITIONS = 50
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+
+
+def cache_settings(size, ttl_var, default_ttl=None):
+    """(maxsize, ttl) for a cache whose TTL comes from the environment.
+
+    Every *_CACHE_TTL setting means the same thing: unset uses the default
+    (None: entries never expire) and 0 or less turns the cache off, just
+    like a size of 0.
+    """
+    ttl = os.environ.get(ttl_var)
+    ttl = default_ttl if ttl is None else float(ttl)
+    if ttl is not None and ttl <= 0:
+        return 0, None
+    return size, ttl
+
+
+# Response caches; both are tied to the loaded model and cleared when it
+# changes, so by default (RESPONSE_CACHE_TTL unset) they never expire
+diagnosis_cache = LRUCache(
+    *cache_settings(int(os.environ.get("DIAGNOSE_CACHE_SIZE", 4096)), "RESPONSE_CACHE_TTL")
+)
+feature_options_cache = LRUCache(*cache_settings(1, "RESPONSE_CACHE_TTL"))
+
+# Part of every diagnosis cache key; bumped on each invalidation so a
+# response computed before a swap or refresh can never be served after it
+cache_generation = 0
+_generation_lock = threading.Lock()
+
+
+def invalidate_caches():
+    """Drop cached responses computed from a previously loaded model"""
+    global cache_generation
+    with _generation_lock:
+        cache_generation += 1
+    diagnosis_cache.clear()
+    feature_options_cache.clear()
+
+
+# Blog posts and guides are read from the database through read-through caches
+content_cache_size, content_cache_ttl = cache_settings(
+    int(os.environ.get("CONTENT_CACHE_SIZE", 1024)), "CONTENT_CACHE_TTL", 60.0
+)
+content_stores = {
+    "posts": ContentStore(
+        "blog_posts",
+        list_columns=("id", "title", "excerpt", "category", "image_url", "created_at"),
+        detail_columns=(
+            "id", "title", "excerpt", "content", "category", "image_url",
+            "author_id", "created_at", "updated_at",
+        ),
+        engine_getter=get_engine,
+        cache_size=content_cache_size,
+        ttl=content_cache_ttl,
+    ),
+    "guides": ContentStore(
+        "guides",
+        list_columns=(
+            "id", "title", "description", "category", "difficulty", "time",
+            "image_url", "created_at",
+        ),
+        detail_columns=(
+            "id", "title", "description", "content", "category", "difficulty",
+            "time", "image_url", "created_at", "updated_at",
+        ),
+        engine_getter=get_engine,
+        cache_size=content_cache_size,
+        ttl=content_cache_ttl,
+    ),
+}
+
+
+# Opted-in diagnoses are written to diagnosis_history off the request path
+history_writer = HistoryWriter(
+    get_engine,
+    max_queue=int(os.environ.get("HISTORY_QUEUE_SIZE", 10000)),
+    batch_size=int(os.environ.get("HISTORY_BATCH_SIZE", 500)),
+    flush_interval=float(os.environ.get("HISTORY_FLUSH_SECONDS", 1.0)),
+)
+
+
+# Metrics are kept per process and served in Prometheus format on /metrics
+metrics_registry = metrics.Registry()
+REQUEST_COUNT = metrics_registry.counter(
+    "http_requests_total", "HTTP requests handled", ("route", "method", "status")
+)
+REQUEST_LATENCY = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("route",)
+)
+DIAGNOSE_STAGE_LATENCY = metrics_registry.histogram(
+    "diagnose_stage_duration_seconds", "Time spent in each stage of a diagnosis", ("stage",)
+)
+DIAGNOSE_ERRORS = metrics_registry.counter(
+    "diagnose_errors_total", "Diagnoses rejected because of invalid input", ("reason",)
+)
+
+
+def error_reason(message):
+    """Collapse a prediction error message into a low-cardinality label"""
+    if message.startswith("Missing feature"):
+        return "missing_feature"
+    if message.startswith("Invalid value"):
+        return "invalid_value"
+    return "other"
 
 
 # Helper function untuk menangani nilai boolean di respons JSON
@@ -27,26 +146,126 @@ def process_boolean_values(data):
     return data
 
 
+def prepare_model(candidate):
+    """Runs on every newly loaded model before it is swapped in"""
+    # MODEL_BACKEND=numpy serves through the sklearn-free NumpyScorer
+    if os.environ.get("MODEL_BACKEND", "sklearn") == "numpy":
+        candidate.use_numpy_scorer(os.environ.get("MODEL_SCORER_DTYPE", "float32"))
+
+    # RANKING_CACHE_SIZE=0 (with DIAGNOSE_CACHE_SIZE=0) makes every request
+    # run the model, e.g. for load tests
+    ranking_cache_size = os.environ.get("RANKING_CACHE_SIZE")
+    if ranking_cache_size is not None:
+        candidate.ranking_cache = LRUCache(maxsize=int(ranking_cache_size))
+
+    # Artifacts saved before the condition graph existed get it from the
+    # dataset, in the background so loading isn't held up by the CSV read
+    if candidate.condition_graph is None and os.path.exists(DATASET_PATH):
+        threading.Thread(
+            target=candidate.build_condition_graph, args=(DATASET_PATH,), daemon=True
+        ).start()
+
+    # Optionally answer predictions from a precomputed table of every input
+    # combination; falls back to live inference when it exceeds the budget
+    prediction_table_mb = float(os.environ.get("PREDICTION_TABLE_MAX_MB", 0))
+    if prediction_table_mb > 0 and candidate.prediction_table is None:
+        if candidate.build_prediction_table(max_bytes=int(prediction_table_mb * 1024 * 1024)):
+            print("Prediction table built")
+        else:
+            print("Prediction table exceeds memory budget, using live inference")
+
+
+# The serving model lives in the registry so it can be swapped without a restart
+# MODEL_MMAP=1 memory-maps the artifact's arrays so workers share their pages
+registry = ModelRegistry(
+    prepare=prepare_model,
+    mmap_mode="r" if os.environ.get("MODEL_MMAP", "0") == "1" else None,
+)
+registry.on_swap(lambda _: invalidate_caches())
+
+# Autocomplete and near-miss resolution over the serving model's feature
+# values. Built on first use rather than at load, so workers that never
+# search don't pay for it; held as (model, index) and replaced as a whole.
+_search_index = (None, None)
+_search_index_lock = threading.Lock()
+
+
+def search_index_for(model):
+    """The search index for model, built the first time it is needed"""
+    global _search_index
+    indexed_model, index = _search_index
+    if indexed_model is model:
+        return index
+
+    with _search_index_lock:
+        indexed_model, index = _search_index
+        if indexed_model is not model:
+            index = SearchIndex.from_model(model)
+            _search_index = (model, index)
+        return index
+
 # Try to load the pre-trained model
-if os.path.exists("model.joblib"):
+if os.path.exists(MODEL_PATH):
     print("Loading pre-trained model...")
-    model_loaded = model.load_model("model.joblib")
-    print(f"Model loaded: {model_loaded}")
+    print(f"Model loaded: {registry.load(MODEL_PATH)}")
 else:
-    # If no pre-trained model exists, train a new one if the dataset exists
-    if os.path.exists("dataset_penyakit_10000_cleaned.csv"):
-        print("Training new model from dataset...")
-        try:
-            model.load_and_prepare_data("dataset_penyakit_10000_cleaned.csv")
-            model.train_model()
-            model.save_model("model.joblib")
-            model_loaded = True
-            print("Model trained and saved successfully!")
-        except Exception as e:
-            print(f"Error training model: {e}")
-            model_loaded = False
+    # If no pre-trained model exists, train a new one in the background so
+    # startup isn't blocked; mock data is served until it is ready
+    if os.path.exists(DATASET_PATH):
+        print("Training new model from dataset in the background...")
+        registry.train_in_background(DATASET_PATH, MODEL_PATH)
     else:
         print("No model or dataset found, using mock data")
+
+metrics_registry.gauge(
+    "model_version", "Number of model swaps since start-up", lambda: {(): registry.version}
+)
+metrics_registry.gauge(
+    "model_load_duration_seconds",
+    "Duration of the last successful model load",
+    lambda: {(): registry.load_seconds},
+)
+metrics_registry.gauge(
+    "model_training_duration_seconds",
+    "Training duration of the serving model",
+    lambda: {(): getattr(registry.current, "training_seconds", None)},
+)
+for stat, metric_type in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+    metrics_registry.gauge(
+        f"response_cache_{stat}" + ("_total" if metric_type == "counter" else ""),
+        f"Response cache {stat}",
+        lambda stat=stat: {
+            ("diagnose",): diagnosis_cache.stats()[stat],
+            ("feature_options",): feature_options_cache.stats()[stat],
+            **{
+                (f"{kind}_{part}",): cache.stats()[stat]
+                for kind, store in content_stores.items()
+                for part, cache in (("items", store.items), ("pages", store.pages))
+            },
+        },
+        labelnames=("cache",),
+        metric_type=metric_type,
+    )
+
+for stat, metric_type in (("enqueued", "counter"), ("dropped", "counter"), ("written", "counter"), ("failed", "counter"), ("queued", "gauge")):
+    metrics_registry.gauge(
+        f"diagnosis_history_{stat}" + ("_total" if metric_type == "counter" else ""),
+        f"Diagnosis history rows {stat}",
+        lambda stat=stat: {(): history_writer.stats()[stat]},
+        metric_type=metric_type,
+    )
+
+# First aid and guides per condition, indexed in memory off the import path
+recommendation_store = RecommendationStore(
+    DATASET_PATH if os.path.exists(DATASET_PATH) else None, get_engine
+)
+recommendation_store.on_refresh(invalidate_caches)
+recommendation_store.start(float(os.environ.get("RECOMMENDATION_REFRESH_SECONDS", 0)))
+
+model_watch_interval = float(os.environ.get("MODEL_WATCH_INTERVAL", 0))
+if model_watch_interval > 0:
+    registry.watch(MODEL_PATH, interval=model_watch_interval)
+
 # Mock data for when the model is not available
 mock_diagnoses = {
     "fever+moderate+4_7_days": {
@@ -109,71 +328,331 @@ default_diagnosis = {
 }
 
 
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - started, route)
+        REQUEST_COUNT.inc(route, request.method, str(response.status_code))
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
+    model = registry.current
     return jsonify(
         {
             "status": "healthy",
             "message": "API is running",
-            "model_loaded": model_loaded,
-            "model_accuracy": model.accuracy if model_loaded else None,
+            "model_loaded": model is not None,
+            "model_accuracy": model.accuracy if model is not None else None,
+            "model_version": registry.version,
+            "cache": {
+                "diagnose": diagnosis_cache.stats(),
+                "feature_options": feature_options_cache.stats(),
+                "rankings": model.ranking_cache.stats() if model is not None else None,
+            },
+            "recommendations": recommendation_store.stats(),
+            "content": {kind: store.stats() for kind, store in content_stores.items()},
+            "history": history_writer.stats(),
         }
     )
 
 
-@app.route("/api/diagnose", methods=["POST"])
-def diagnose():
-    data = request.json
+def request_features(data, model=None):
+    """Map a diagnose request body to the model's input features"""
+    features = {
+        "symptom": data.get("symptom"),
+        "severity": data.get("severity"),
+        "duration": data.get("duration"),
+    }
+
+    # Model feature columns sent directly in the body are passed through
+    if model is not None:
+        for colname in model.feature_columns:
+            if colname in data:
+                features[colname] = data[colname]
+
+    # Normalized here, once, so the cache key and predict see the same input
+    return {
+        name: value.strip() if isinstance(value, str) else value
+        for name, value in features.items()
+    }
 
-    if model_loaded:
-        # Use the trained model for prediction
-        result = model.predict(
-            {
-                "symptom": data.get("symptom"),
-                "severity": data.get("severity"),
-                "duration": data.get("duration"),
-            }
-        )
 
-        if "error" in result:
-            return jsonify({"error": result["error"]}), 400
+def cache_key(features):
+    """Hashable key for already-normalized request features.
 
-        # Format the response
-        response = {
-            "condition": result["condition"],
-            "description": f"Based on your symptoms, you may have {result['condition']}.",
-            "confidence": result["confidence"],
-            "firstAid": get_first_aid_recommendations(result["condition"]),
+    Returns None for inputs that can't be a dict key (e.g. nested objects);
+    those requests skip the cache and get predict's validation error.
+    """
+    key = tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in sorted(features.items())
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def format_diagnosis(result):
+    """Build the diagnose response for a successful model prediction"""
+    response = {
+        "condition": result["condition"],
+        "description": f"Based on your symptoms, you may have {result['condition']}.",
+        "confidence": result["confidence"],
+        "firstAid": get_first_aid_recommendations(result["condition"]),
+    }
+
+    recommendation = recommendation_store.get(result["condition"])
+    if recommendation is not None:
+        response["relatedConditions"] = list(recommendation.related)
+        response["guides"] = [dict(guide) for guide in recommendation.guides]
+
+    # Differential diagnosis, only when the request asked for ?k=
+    if "top_k" in result:
+        response["differential"] = result["top_k"]
+
+    return response
+
+
+def requested_k(value):
+    """Parse the optional ?k= top-k parameter; None when absent or invalid"""
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        return None
+    return min(k, MAX_TOP_K) if k > 0 else None
+
+
+def mock_diagnosis(data):
+    key = f"{data.get('symptom')}+{data.get('severity')}+{data.get('duration')}"
+    return mock_diagnoses.get(key, default_diagnosis)
+
+
+def request_user_id(authorization):
+    """User id of a verified Supabase session token, or None.
+
+    Tokens are checked against SUPABASE_JWT_SECRET; without it, or without
+    a valid token, nobody is identified.
+    """
+    secret = os.environ.get("SUPABASE_JWT_SECRET")
+    token = bearer_token(authorization)
+    if not secret or token is None:
+        return None
+
+    claims = verify_hs256(token, secret)
+    return claims.get("sub") if claims else None
+
+
+def record_history(data, response, authorization=None):
+    """Queue the diagnosis for diagnosis_history if the request opted in.
+
+    The row belongs to the user of the request's Authorization token, never
+    to a user_id from the body; anonymous diagnoses are stored with NULL.
+    """
+    if not data.get("save_history") or not history_writer.enabled:
+        return
+
+    symptoms = data.get("symptom") or data.get("nama_penyakit")
+    if isinstance(symptoms, list):
+        symptoms = ", ".join(map(str, symptoms))
+
+    history_writer.record(
+        {
+            "user_id": request_user_id(authorization),
+            "condition": response["condition"],
+            "symptoms": symptoms or "",
+            "severity": data.get("severity") or "",
+            "duration": data.get("duration") or "",
+            "confidence": response["confidence"],
+            "recommendations": ", ".join(response.get("firstAid", [])),
         }
+    )
+
+
+def resolve_features(model, features):
+    """Replace unknown categorical inputs with their closest known value.
+
+    Returns the corrected features, {column: resolved value} for every input
+    that changed and {column: {input: candidates}} for inputs with several
+    equally close matches. Ambiguous inputs, and inputs with no close match,
+    are left for predict to reject as usual.
+    """
+    index = search_index_for(model)
+    features = dict(features)
+    resolved = {}
+    suggestions = {}
+
+    def resolve(colname, value):
+        match, candidates = index.resolve(colname, value)
+        if candidates:
+            suggestions.setdefault(colname, {})[value] = candidates
+        return match
+
+    for colname, encoder in zip(model.feature_columns, model.feature_encoders):
+        value = features.get(colname)
+        if encoder is None or not isinstance(value, (str, list)):
+            continue
+
+        if model._is_multi_value(colname):
+            tokens = value if isinstance(value, list) else split_value(value)
+            fixed = [
+                token if not isinstance(token, str) or token in encoder
+                else resolve(colname, token) or token
+                for token in tokens
+            ]
+            if fixed != list(tokens):
+                features[colname] = resolved[colname] = fixed
+        elif isinstance(value, str) and value not in encoder:
+            match = resolve(colname, value)
+            if match is not None:
+                features[colname] = resolved[colname] = match
+
+    return features, resolved, suggestions
+
+
+def start_diagnosis(model, data, k=None):
+    """First half of a diagnose request: features, cache key and any cached response.
+
+    With "resolve": true in the body, near-miss inputs are corrected through
+    the search index before prediction. The last item is (resolved inputs,
+    suggestions for ambiguous ones), for with_resolution.
+    """
+    features = request_features(data, model)
+    resolution = ({}, {})
+    if data.get("resolve"):
+        features, resolved, suggestions = resolve_features(model, features)
+        resolution = (resolved, suggestions)
+    key = cache_key(features)
+    if key is None:
+        return features, None, None, resolution
+    key = (cache_generation, key, k)
+    return features, key, diagnosis_cache.get(key), resolution
+
+
+def with_resolution(response, status, resolution):
+    """Report resolved inputs on success, or candidates for ambiguous ones on a 400.
+
+    Never touches the cached response.
+    """
+    resolved, suggestions = resolution
+    if status == 200 and resolved:
+        return {**response, "resolvedInputs": resolved}
+    if status == 400 and suggestions:
+        return {**response, "suggestions": suggestions}
+    return response
+
+
+def finish_diagnosis(key, result, model):
+    """Second half: turn a prediction into (response, status) and cache successes.
+
+    Nothing is cached if the model was swapped or the caches invalidated
+    while the request was being served.
+    """
+    if "error" in result:
+        DIAGNOSE_ERRORS.inc(error_reason(result["error"]))
+        return {"error": result["error"]}, 400
+
+    with DIAGNOSE_STAGE_LATENCY.time("recommendations"):
+        response = format_diagnosis(result)
+    if key is not None and key[0] == cache_generation and registry.current is model:
+        diagnosis_cache.set(key, response)
+    return response, 200
+
+
+@app.route("/api/diagnose", methods=["POST"])
+def diagnose():
+    with DIAGNOSE_STAGE_LATENCY.time("parse"):
+        data = request.json
+    model = registry.current
+    k = requested_k(request.args.get("k"))
+
+    if model is not None:
+        with DIAGNOSE_STAGE_LATENCY.time("cache_lookup"):
+            features, key, response, resolution = start_diagnosis(model, data, k)
+
+        if response is None:
+            # Use the trained model for prediction
+            timings = {}
+            result = model.predict(features, timings=timings, k=k)
+            for stage, seconds in timings.items():
+                DIAGNOSE_STAGE_LATENCY.observe(seconds, stage)
+
+            response, status = finish_diagnosis(key, result, model)
+        else:
+            status = 200
 
-        return jsonify(response)
+        response = with_resolution(response, status, resolution)
     else:
         # Use mock data if model is not available
-        key = f"{data.get('symptom')}+{data.get('severity')}+{data.get('duration')}"
-        result = mock_diagnoses.get(key, default_diagnosis)
+        response, status = mock_diagnosis(data), 200
+
+    if status == 200:
+        with DIAGNOSE_STAGE_LATENCY.time("history"):
+            record_history(data, response, request.headers.get("Authorization"))
+
+    with DIAGNOSE_STAGE_LATENCY.time("serialize"):
+        return jsonify(response), status
+
+
+@app.route("/api/diagnose/batch", methods=["POST"])
+def diagnose_batch():
+    data = request.get_json(silent=True) or {}
+    inputs = data.get("inputs")
+
+    if not isinstance(inputs, list):
+        return jsonify({"error": "'inputs' must be a list of diagnose requests"}), 400
+    if len(inputs) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} inputs per batch"}), 413
+
+    model = registry.current
+    k = requested_k(request.args.get("k"))
+    if model is not None:
+        # Invalid rows are reported inline so the rest of the batch still runs
+        features_list = [
+            request_features(item, model) if isinstance(item, dict) else item
+            for item in inputs
+        ]
+        results = []
+        for result in model.predict_batch(features_list, k=k):
+            if "error" in result:
+                DIAGNOSE_ERRORS.inc(error_reason(result["error"]))
+                results.append(result)
+            else:
+                results.append(format_diagnosis(result))
+    else:
+        results = [
+            mock_diagnosis(item) if isinstance(item, dict)
+            else {"error": "Each input must be an object"}
+            for item in inputs
+        ]
 
-        return jsonify(result)
+    return jsonify({"results": results, "total": len(results)})
 
 
 @app.route("/api/feature-options", methods=["GET"])
 def get_feature_options():
     try:
-        if model_loaded:
-            # Ambil data dari model
-            model_data = model.get_feature_options()
-
-            # Kembalikan format yang diharapkan frontend
+        model = registry.current
+        if model is not None:
             return jsonify(
-                {
-                    "symptom": model_data.get("nama_penyakit", []),
-                    "severity": ["mild", "moderate", "severe"],
-                    "duration": [
-                        "less_than_day",
-                        "1_3_days",
-                        "4_7_days",
-                        "more_than_week",
-                    ],
-                }
+                feature_options_cache.get_or_set(
+                    "options", lambda: build_feature_options(model)
+                )
             )
         else:
             # Return mock options
@@ -194,9 +673,44 @@ def get_feature_options():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/feature-options/search", methods=["GET"])
+def search_feature_options():
+    query = request.args.get("q", "")
+    limit = max(1, min(request.args.get("limit", 10, type=int), MAX_SEARCH_RESULTS))
+    column = request.args.get("column")
+
+    model = registry.current
+    results = (
+        search_index_for(model).search(query, limit=limit, column=column)
+        if model is not None else []
+    )
+    return jsonify({"query": query, "results": results})
+
+
+def build_feature_options(model):
+    # Ambil data dari model
+    model_data = model.get_feature_options()
+
+    # Kembalikan format yang diharapkan frontend
+    return {
+        "symptom": model_data.get("nama_penyakit", []),
+        "severity": ["mild", "moderate", "severe"],
+        "duration": [
+            "less_than_day",
+            "1_3_days",
+            "4_7_days",
+            "more_than_week",
+        ],
+    }
+
+
 def get_first_aid_recommendations(condition):
     """Return first aid recommendations based on the condition"""
-    # This would ideally come from a database or more sophisticated source
+    # Data-driven recommendations from the in-memory index come first
+    recommendation = recommendation_store.get(condition)
+    if recommendation is not None and recommendation.first_aid:
+        return list(recommendation.first_aid)
+
     recommendations = {
         "Influenza": [
             "Istirahat dan tetap terhidrasi",
@@ -211,7 +725,6 @@ def get_first_aid_recommendations(condition):
             "Tetap terhidrasi",
             "Konsultasikan dengan dokter untuk migrain berulang",
         ],
-        # Add more conditions and recommendations as needed
     }
 
     return recommendations.get(
@@ -224,8 +737,57 @@ def get_first_aid_recommendations(condition):
     )
 
 
+def page_size(value, default=20):
+    """Parse a page size (?limit= or ?per_page=), clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def list_content(kind):
+    """One keyset-paginated page of posts or guides; ?cursor= continues a listing"""
+    store = content_stores[kind]
+    category = request.args.get("category")
+    try:
+        rows, next_cursor, total = store.list_page(
+            limit=page_size(request.args.get("limit", request.args.get("per_page"))),
+            cursor=request.args.get("cursor"),
+            category=category,
+            fields=request.args.get("fields"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({kind: rows, "total": total, "next_cursor": next_cursor})
+
+
+def content_detail(kind, row_id):
+    """A single post or guide with ETag/Last-Modified; answers 304 when unchanged"""
+    try:
+        entry = content_stores[kind].get(row_id, fields=request.args.get("fields"))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    if entry is None:
+        return jsonify({"error": "Not found"}), 404
+
+    response = Response(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    response.last_modified = entry.last_modified
+    return response.make_conditional(request)
+
+
 @app.route("/api/posts", methods=["GET"])
 def get_posts():
+    if content_stores["posts"].available:
+        return list_content("posts")
+
     # Mock blog posts
     posts = [
         {
@@ -253,6 +815,9 @@ def get_posts():
 
 @app.route("/api/posts/<int:post_id>", methods=["GET"])
 def get_post(post_id):
+    if content_stores["posts"].available:
+        return content_detail("posts", post_id)
+
     # Mock single post
     post = {
         "id": post_id,
@@ -271,15 +836,45 @@ def get_post(post_id):
     return jsonify(post)
 
 
+@app.route("/api/guides", methods=["GET"])
+def get_guides():
+    if not content_stores["guides"].available:
+        return jsonify({"guides": [], "total": 0, "next_cursor": None})
+    return list_content("guides")
+
+
+@app.route("/api/guides/<int:guide_id>", methods=["GET"])
+def get_guide(guide_id):
+    if not content_stores["guides"].available:
+        return jsonify({"error": "Not found"}), 404
+    return content_detail("guides", guide_id)
+
+
+@app.route("/api/conditions/<name>/related", methods=["GET"])
+def get_related_conditions(name):
+    model = registry.current
+    graph = model.condition_graph if model is not None else None
+    if graph is None:
+        return jsonify({"error": "Condition graph not available"}), 404
+
+    if name not in graph:
+        return jsonify({"error": f"Unknown condition: {name}"}), 404
+
+    limit = max(1, min(request.args.get("limit", 10, type=int), MAX_RELATED_CONDITIONS))
+    return jsonify(graph.related(name, limit=limit))
+
+
 @app.route("/api/model-info", methods=["GET"])
 def get_model_info():
-    if model_loaded:
+    model = registry.current
+    if model is not None:
         return jsonify(
             {
                 "accuracy": model.accuracy,
                 "most_important_feature": model.most_important_feature,
                 "features": list(model.cat_value_dicts.keys()),
                 "target": model.final_colname,
+                "estimator": type(model.model).__name__,
             }
         )
     else:
@@ -292,6 +887,77 @@ def get_model_info():
         )
 
 
+def is_admin_request():
+    """Check the request's bearer token against ADMIN_API_TOKEN"""
+    token = os.environ.get("ADMIN_API_TOKEN")
+    if not token:
+        return False
+
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+@app.route("/api/admin/model", methods=["GET"])
+def model_status():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+
+    return jsonify(registry.status())
+
+
+@app.route("/api/admin/model/reload", methods=["POST"])
+def reload_model():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+
+    # Only artifacts next to the configured model file can be loaded
+    data = request.get_json(silent=True) or {}
+    filename = os.path.basename(data.get("filename") or MODEL_PATH)
+    model_path = os.path.join(os.path.dirname(MODEL_PATH), filename)
+
+    if not os.path.exists(model_path):
+        return jsonify({"error": f"Model file not found: {filename}"}), 404
+
+    if not registry.reload_in_background(model_path):
+        return jsonify({"error": "A reload is already in progress"}), 409
+
+    return jsonify({"status": "reloading", "source": model_path}), 202
+
+
+@app.route("/api/admin/model/rollback", methods=["POST"])
+def rollback_model():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+
+    if registry.reloading:
+        return jsonify({"error": "A reload is in progress"}), 409
+
+    if not registry.rollback():
+        return jsonify({"error": "No previous model to roll back to"}), 409
+
+    return jsonify(registry.status())
+
+
+@app.route("/api/admin/content/<kind>/invalidate", methods=["POST"])
+def invalidate_content(kind):
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+
+    if kind not in content_stores:
+        return jsonify({"error": f"Unknown content type: {kind}"}), 404
+
+    # Call after editing a post or guide; omit "id" to drop the whole cache.
+    # Only this worker's cache is cleared: other workers serve their cached
+    # copy until it expires (CONTENT_CACHE_TTL, 60s by default).
+    data = request.get_json(silent=True) or {}
+    row_id = data.get("id")
+    if row_id is not None and not isinstance(row_id, int):
+        return jsonify({"error": "'id' must be an integer"}), 400
+
+    content_stores[kind].invalidate(row_id)
+    return jsonify({"status": "invalidated", "kind": kind, "id": row_id, "scope": "worker"})
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1,220 @@
+"""ASGI entry point that micro-batches concurrent /api/diagnose requests.
+
+POST /api/diagnose is served natively: requests that arrive within
+MICROBATCH_MAX_WAIT_MS of each other (up to MICROBATCH_MAX_SIZE) are
+coalesced into one predict_batch call, i.e. a single vectorized
+predict_proba. Every other route is passed through to the Flask app.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (
+    DIAGNOSE_STAGE_LATENCY,
+    REQUEST_COUNT,
+    REQUEST_LATENCY,
+    app,
+    finish_diagnosis,
+    history_writer,
+    mock_diagnosis,
+    record_history,
+    registry,
+    requested_k,
+    start_diagnosis,
+    with_resolution,
+)
+
+
+class MicroBatcher:
+    """Coalesces predictions submitted within a short window into one call"""
+
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched_requests = 0
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, model, features, k=None):
+        if self._worker is None:
+            # Created lazily so the queue and task belong to the running loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((model, k, features, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+
+            # A reload can land mid-window; each request keeps the model it saw
+            groups = {}
+            for model, k, features, future in batch:
+                groups.setdefault((id(model), k), (model, k, []))[2].append((features, future))
+
+            for model, k, items in groups.values():
+                try:
+                    # Inference runs off the event loop so new requests keep queueing
+                    results = await loop.run_in_executor(
+                        None, model.predict_batch, [features for features, _ in items], k
+                    )
+                except Exception as e:
+                    results = [e] * len(items)
+
+                for (_, future), result in zip(items, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+            self.batches += 1
+            self.batched_requests += len(batch)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+
+batcher = MicroBatcher(
+    max_batch_size=int(os.environ.get("MICROBATCH_MAX_SIZE", 64)),
+    max_wait_ms=float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 2)),
+)
+flask_app = WsgiToAsgi(app)
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, payload, status=200):
+    with DIAGNOSE_STAGE_LATENCY.time("serialize"):
+        body = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def request_header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def diagnose(scope, receive, send):
+    query = parse_qs(scope.get("query_string", b"").decode())
+    k = requested_k(query.get("k", [None])[0])
+    body = await read_body(receive)
+    try:
+        with DIAGNOSE_STAGE_LATENCY.time("parse"):
+            data = json.loads(body)
+    except ValueError:
+        data = None
+
+    if not isinstance(data, dict):
+        await send_json(send, {"error": "Request body must be a JSON object"}, 400)
+        return 400
+
+    model = registry.current
+    if model is None:
+        # Use mock data if model is not available
+        response, status = mock_diagnosis(data), 200
+    else:
+        with DIAGNOSE_STAGE_LATENCY.time("cache_lookup"):
+            if data.get("resolve"):
+                # Resolving may build the search index; keep that off the event loop
+                features, key, response, resolution = await asyncio.get_running_loop().run_in_executor(
+                    None, start_diagnosis, model, data, k
+                )
+            else:
+                features, key, response, resolution = start_diagnosis(model, data, k)
+
+        if response is None:
+            # Queue wait plus the shared predict_batch call
+            with DIAGNOSE_STAGE_LATENCY.time("batched_inference"):
+                result = await batcher.submit(model, features, k)
+            response, status = finish_diagnosis(key, result, model)
+        else:
+            status = 200
+
+        response = with_resolution(response, status, resolution)
+
+    if status == 200:
+        with DIAGNOSE_STAGE_LATENCY.time("history"):
+            record_history(data, response, request_header(scope, b"authorization"))
+
+    await send_json(send, response, status)
+    return status
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await batcher.close()
+            # Flush queued diagnosis history before the worker exits
+            await asyncio.get_running_loop().run_in_executor(None, history_writer.close)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif (
+        scope["type"] == "http"
+        and scope["method"] == "POST"
+        and scope["path"] == "/api/diagnose"
+    ):
+        started = time.perf_counter()
+        status = await diagnose(scope, receive, send)
+        REQUEST_LATENCY.observe(time.perf_counter() - started, "/api/diagnose")
+        REQUEST_COUNT.inc("/api/diagnose", "POST", str(status))
+    else:
+        await flask_app(scope, receive, send)
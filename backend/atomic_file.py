@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+
+def atomic_write(path, writer, suffix=".tmp", mode=0o644):
+    """Write path by calling writer(f) on a temp file beside it, then renaming.
+
+    Readers (and the model watcher) never see a partial file, and the temp
+    name is unique so concurrent writers don't collide. The temp file is
+    removed if anything fails; the error is re-raised.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer(f)
+        os.chmod(tmp_path, mode)  # mkstemp creates it owner-only
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
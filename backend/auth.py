@@ -0,0 +1,52 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def verify_hs256(token, secret, audience="authenticated", now=None):
+    """Return the claims of an HS256-signed JWT, or None if it doesn't verify.
+
+    This is how Supabase signs session access tokens (with the project's
+    JWT secret), so no JWT library is needed. The signature, ``exp`` and
+    ``aud`` are checked.
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        claims = json.loads(_b64decode(payload_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, AttributeError):
+        return None
+
+    if not isinstance(header, dict) or header.get("alg") != "HS256" or not isinstance(claims, dict):
+        return None
+
+    expected = hmac.new(
+        secret.encode(), f"{header_b64}.{payload_b64}".encode(), hashlib.sha256
+    ).digest()
+    if not hmac.compare_digest(signature, expected):
+        return None
+
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= (now if now is not None else time.time()):
+        return None
+
+    aud = claims.get("aud")
+    if audience is not None and audience != aud and audience not in (aud if isinstance(aud, list) else []):
+        return None
+
+    return claims
+
+
+def bearer_token(authorization):
+    """The token of an "Authorization: Bearer <token>" header value, or None"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
@@ -0,0 +1,95 @@
+"""Compare the per-row loop encoder with the vectorized one.
+
+Run from the backend directory:
+
+    python -m benchmarks.encoding --sizes 10000,100000,1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml_model import encode_categorical
+
+
+def encode_loop(colval):
+    """Reference implementation: the original per-row label encoding"""
+    new_dict = {}
+    val = 0
+    transformed_col_vals = []
+
+    for item in colval.values:
+        if item not in new_dict:
+            new_dict[item] = val
+            val += 1
+        transformed_col_vals.append(new_dict[item])
+
+    return transformed_col_vals, new_dict
+
+
+def encode_frame(frame, encoder):
+    data = pd.DataFrame()
+    cat_value_dicts = {}
+
+    for colname, colval in frame.items():
+        if isinstance(colval.values[0], (np.integer, float)):
+            data[colname] = colval.copy()
+            continue
+
+        codes, new_dict = encoder(colval)
+        cat_value_dicts[colname] = new_dict
+        data[colname] = codes
+
+    return data, cat_value_dicts
+
+
+def resample(frame, n_rows, seed=42):
+    """Grow or shrink the dataset to n_rows by sampling rows with replacement"""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(frame), size=n_rows)
+    return frame.iloc[idx].reset_index(drop=True)
+
+
+def time_call(func, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="dataset_penyakit_10000_cleaned.csv")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.data)
+
+    print(f"{'rows':>10} {'loop (s)':>10} {'vector (s)':>11} {'speedup':>8}")
+    for n_rows in (int(size) for size in args.sizes.split(",")):
+        frame = resample(source, n_rows)
+
+        loop_time, (loop_data, loop_dicts) = time_call(
+            encode_frame, frame, encode_loop, repeat=args.repeat
+        )
+        vector_time, (vector_data, vector_dicts) = time_call(
+            encode_frame, frame, encode_categorical, repeat=args.repeat
+        )
+
+        # Both paths must produce the same codes and dictionaries
+        assert loop_dicts == vector_dicts
+        assert (loop_data.to_numpy() == vector_data.to_numpy()).all()
+
+        print(
+            f"{n_rows:>10} {loop_time:>10.4f} {vector_time:>11.4f} "
+            f"{loop_time / vector_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
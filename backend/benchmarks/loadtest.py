@@ -0,0 +1,196 @@
+"""Load-test one or more running servers and report latency percentiles.
+
+Start the servers first with the response and ranking caches off, so
+every request reaches predict_proba rather than an LRU hit, e.g. the sync
+Flask setup and the ASGI mode:
+
+    export DIAGNOSE_CACHE_SIZE=0 RANKING_CACHE_SIZE=0
+    gunicorn --bind 0.0.0.0:5000 app:app
+    uvicorn asgi:application --port 5001
+
+then from the backend directory:
+
+    python -m benchmarks.loadtest \
+        --url http://localhost:5000/api/diagnose \
+        --url http://localhost:5001/api/diagnose \
+        --concurrency 32 --requests 5000
+
+Each server's /api/health is checked first and the run refuses to start
+while its caches are on (override with --allow-cache). Responses are
+counted as ok (2xx), rejected (4xx) or errors (5xx and connection
+failures); throughput and latencies only cover ok responses, and the
+command exits with status 1 if any server answered none.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+
+def sample_payloads(data_path, n_payloads, seed=42):
+    """Build request bodies from real dataset rows so predictions are valid"""
+    frame = pd.read_csv(data_path)
+    features = frame.iloc[:, :-1].sample(
+        n=min(n_payloads, len(frame)), random_state=seed
+    )
+    return [
+        json.dumps(row, default=bool).encode()
+        for row in features.to_dict("records")
+    ]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def enabled_caches(url):
+    """Names of the server's diagnose caches that are on, from /api/health"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    try:
+        conn.request("GET", parts.path.rsplit("/", 1)[0] + "/health")
+        health = json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+    caches = health.get("cache", {})
+    return [
+        name for name in ("diagnose", "rankings") if (caches.get(name) or {}).get("maxsize", 0) > 0
+    ]
+
+
+def run(url, payloads, concurrency, n_requests):
+    parts = urlsplit(url)
+    latencies = []
+    rejected = 0
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(n_requests))
+
+    def worker():
+        nonlocal rejected, errors
+        # One keep-alive connection per client thread
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        rng = random.Random()
+        local, local_rejected, local_errors = [], 0, 0
+
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+
+            body = rng.choice(payloads)
+            start = time.perf_counter()
+            try:
+                conn.request(
+                    "POST", parts.path, body, {"Content-Type": "application/json"}
+                )
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+
+            # A rejected payload returns early, so it must not count as fast
+            if response.status >= 500:
+                local_errors += 1
+            elif response.status >= 400:
+                local_rejected += 1
+            else:
+                local.append(time.perf_counter() - start)
+
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            rejected += local_rejected
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "url": url,
+        "requests": len(latencies),
+        "rejected": rejected,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p90_ms": percentile(latencies, 90) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", action="append", required=True)
+    parser.add_argument("--data", default="dataset_penyakit_10000_cleaned.csv")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=1000,
+        help="Distinct payloads to cycle through (fewer means more cache hits)",
+    )
+    parser.add_argument(
+        "--allow-cache",
+        action="store_true",
+        help="Run even if a server has its diagnose or ranking cache on",
+    )
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    if not args.allow_cache:
+        for url in args.url:
+            caches = enabled_caches(url)
+            if caches:
+                sys.exit(
+                    f"{url}: {', '.join(caches)} cache is on, so this would mostly time cache "
+                    "hits; restart it with DIAGNOSE_CACHE_SIZE=0 RANKING_CACHE_SIZE=0 "
+                    "or pass --allow-cache"
+                )
+
+    payloads = sample_payloads(args.data, args.distinct)
+
+    results = [run(url, payloads, args.concurrency, args.requests) for url in args.url]
+
+    print(
+        f"{'url':<40} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+        f"{'rejected':>9} {'errors':>7}"
+    )
+    for r in results:
+        if not r["requests"]:
+            print(f"{r['url']:<40} {'no successful responses':>44} {r['rejected']:>9} {r['errors']:>7}")
+            continue
+        print(
+            f"{r['url']:<40} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} "
+            f"{r['p90_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rejected']:>9} {r['errors']:>7}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if any(not r["requests"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
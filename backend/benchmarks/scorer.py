@@ -0,0 +1,124 @@
+"""Check the NumPy scorer against sklearn and time both per call.
+
+Every row of the dataset is encoded and scored by the sklearn estimator
+and by a NumpyScorer in each dtype. Predicted classes must match and
+probabilities must agree within the dtype's tolerance; the command exits
+with status 1 otherwise. Run from the backend directory:
+
+    python -m benchmarks.scorer --model model.joblib
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml_model import HealthRecommendationModel
+
+# Largest acceptable absolute difference in any class probability
+TOLERANCES = {"float64": 1e-9, "float32": 1e-5}
+
+
+def encoded_rows(model, frame):
+    rows = []
+    for features in frame.to_dict("records"):
+        row, error = model.encode_features(features)
+        if error is None:
+            rows.append(row)
+    return rows
+
+
+def check(model, x, dtype):
+    """Compare predictions and probabilities of sklearn and the scorer on x"""
+    scorer = model.numpy_scorer(dtype)
+    expected_proba = model.model.predict_proba(x)
+    actual_proba = scorer.predict_proba(x)
+    mismatches = int((model.model.predict(x) != scorer.predict(x)).sum())
+    max_error = float(np.abs(expected_proba - actual_proba).max())
+
+    return {
+        "dtype": dtype,
+        "rows": x.shape[0],
+        "prediction_mismatches": mismatches,
+        "max_probability_error": max_error,
+        "tolerance": TOLERANCES[dtype],
+        "ok": mismatches == 0 and max_error <= TOLERANCES[dtype],
+    }
+
+
+def per_call_seconds(func, arg, n_calls):
+    func(arg)  # warm up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        func(arg)
+    return (time.perf_counter() - start) / n_calls
+
+
+def bench(model_path, model, x, features, n_calls):
+    """Per-call latency of predict_proba on one row, and of a full predict"""
+    one_row = x[:1]
+    results = {}
+
+    scorers = {"sklearn": model.model}
+    scorers.update({dtype: model.numpy_scorer(dtype) for dtype in TOLERANCES})
+
+    for name, scorer in scorers.items():
+        # A fresh copy with this scorer and no ranking cache or prediction
+        # table, so every call runs the model
+        serving = HealthRecommendationModel(ranking_cache_size=0)
+        serving.load_model(model_path)
+        serving.model = scorer
+        serving.prediction_table = None
+
+        results[name] = {
+            "predict_proba_us": per_call_seconds(scorer.predict_proba, one_row, n_calls) * 1e6,
+            "predict_us": per_call_seconds(serving.predict, features, n_calls) * 1e6,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="model.joblib")
+    parser.add_argument("--data", default="dataset_penyakit_10000_cleaned.csv")
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    model = HealthRecommendationModel()
+    if not model.load_model(args.model):
+        sys.exit(f"Model file not found: {args.model}")
+
+    frame = pd.read_csv(args.data).drop(columns=[model.final_colname])
+    rows = encoded_rows(model, frame)
+    if not rows:
+        sys.exit("No dataset row could be encoded with this model")
+    x = model.design_matrix_from_rows(rows)
+
+    checks = [check(model, x, dtype) for dtype in TOLERANCES]
+    timings = bench(args.model, model, x, frame.iloc[0].to_dict(), args.calls)
+
+    print(f"{'dtype':<8} {'rows':>7} {'mismatches':>11} {'max |dp|':>10}  result")
+    for result in checks:
+        print(
+            f"{result['dtype']:<8} {result['rows']:>7} {result['prediction_mismatches']:>11} "
+            f"{result['max_probability_error']:>10.2e}  {'ok' if result['ok'] else 'FAIL'}"
+        )
+
+    print()
+    print(f"{'scorer':<8} {'predict_proba us':>17} {'predict us':>11}")
+    for name, result in timings.items():
+        print(f"{name:<8} {result['predict_proba_us']:>17.1f} {result['predict_us']:>11.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"checks": checks, "timings": timings}, f, indent=2)
+
+    if not all(result["ok"] for result in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Measure worker cold start: import time and memory of `import app`.
+
+Each mode runs in fresh subprocesses, like a gunicorn worker booting.
+Run from the backend directory:
+
+    python -m benchmarks.startup --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Runs inside each child process; prints one JSON line with its measurements
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+model = app.registry.current
+if model is not None:
+    app.registry.smoke_test(model)  # one real prediction, same row as a reload
+elapsed = time.perf_counter() - start
+
+def status(path, keys):
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in keys:
+                    values[name] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+memory = status("/proc/self/status", {"VmRSS", "RssAnon", "RssFile"})
+memory.update(status("/proc/self/smaps_rollup", {"Pss"}))
+print(json.dumps({
+    "import_s": elapsed,
+    "memory_kb": memory,
+    "heavy_modules": sorted(m for m in ("pandas", "sklearn", "scipy") if m in sys.modules),
+}))
+sys.stdout.flush()
+sys.stdin.read()  # stay alive until the parent has sampled every worker
+"""
+
+MODES = {
+    "default": {},
+    "mmap": {"MODEL_MMAP": "1"},
+}
+
+
+def run_mode(env_overrides, workers):
+    """Boot `workers` processes side by side and collect their reports"""
+    env = {**os.environ, **env_overrides}
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for _ in range(workers)
+    ]
+
+    # Only the JSON line matters; app.py prints start-up messages too
+    reports = []
+    for proc in procs:
+        for line in proc.stdout:
+            if line.startswith("{"):
+                reports.append(json.loads(line))
+                break
+
+    for proc in procs:
+        proc.communicate("")
+
+    return reports
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def summarize(reports):
+    def memory(key):
+        return _mean([r["memory_kb"].get(key, 0) for r in reports])
+
+    return {
+        "workers": len(reports),
+        "import_s_mean": _mean([r["import_s"] for r in reports]),
+        "import_s_max": max(r["import_s"] for r in reports),
+        "rss_kb_mean": memory("VmRSS"),
+        "rss_anon_kb_mean": memory("RssAnon"),
+        "rss_file_kb_mean": memory("RssFile"),
+        "pss_kb_mean": memory("Pss"),
+        "heavy_modules": reports[0]["heavy_modules"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        start = time.perf_counter()
+        results[mode] = summarize(run_mode(MODES[mode], args.workers))
+        results[mode]["wall_s"] = time.perf_counter() - start
+
+    for mode, summary in results.items():
+        print(
+            f"{mode:<8} import {summary['import_s_mean']:.3f}s "
+            f"(max {summary['import_s_max']:.3f}s)  "
+            f"RSS {summary['rss_kb_mean'] / 1024:.1f} MB  "
+            f"anon {summary['rss_anon_kb_mean'] / 1024:.1f} MB  "
+            f"PSS {summary['pss_kb_mean'] / 1024:.1f} MB  "
+            f"heavy: {', '.join(summary['heavy_modules']) or '-'}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
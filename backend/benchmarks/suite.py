@@ -0,0 +1,245 @@
+"""Time the training and inference hot paths on synthetic datasets.
+
+Datasets are resampled from the real CSV to each size, so they keep its
+columns and value distributions. Run from the backend directory:
+
+    python -m benchmarks.suite --sizes 10000,100000,1000000 --output after.json
+    python -m benchmarks.suite --compare before.json after.json
+
+With only --compare BASELINE the suite runs first and compares the fresh
+results against BASELINE. Metrics slower by more than --threshold are
+reported as regressions and make the command exit with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.encoding import resample, time_call
+from ml_model import HealthRecommendationModel
+
+# Rate metrics are better when higher; everything else is a duration
+RATE_SUFFIX = "_rps"
+
+
+def sample_rows(frame, final_colname, n_rows, seed=0):
+    """Feature dicts drawn from the dataset, as a client would send them"""
+    features = frame.drop(columns=[final_colname]).sample(
+        n=min(n_rows, len(frame)), random_state=seed
+    )
+    return features.to_dict("records")
+
+
+def bench_model(csv_path, encoding, n_predict, batch_size, repeat, workdir):
+    results = {}
+
+    results["csv_load_s"], frame = time_call(pd.read_csv, csv_path, repeat=repeat)
+
+    def prepare(use_cache=False):
+        model = HealthRecommendationModel(encoding=encoding)
+        model.load_and_prepare_data(csv_path, use_cache=use_cache)
+        return model
+
+    # Includes reading the CSV; subtract csv_load_s for the encoding alone.
+    # The dataset cache is off here so every repeat runs the encoding path.
+    results["load_and_prepare_s"], model = time_call(prepare, repeat=repeat)
+
+    # Reads from a warm dataset cache private to this run
+    os.environ["DATASET_CACHE_DIR"] = os.path.join(workdir, "dataset_cache")
+    prepare(use_cache=True)
+    results["load_and_prepare_cached_s"], _ = time_call(prepare, True, repeat=repeat)
+    results["fit_s"], _ = time_call(model.train_model, repeat=repeat)
+    results["accuracy"] = model.accuracy
+
+    model_path = os.path.join(workdir, f"{encoding}.joblib")
+    results["save_model_s"], _ = time_call(model.save_model, model_path, repeat=repeat)
+    results["artifact_bytes"] = os.path.getsize(model_path)
+
+    # No ranking cache, so every prediction runs the model
+    def load():
+        loaded = HealthRecommendationModel(ranking_cache_size=0)
+        loaded.load_model(model_path)
+        return loaded
+
+    results["load_model_s"], model = time_call(load, repeat=repeat)
+
+    rows = sample_rows(frame, model.final_colname, n_predict)
+
+    def predict_single():
+        for row in rows:
+            model.predict(row)
+
+    def predict_batched():
+        for start in range(0, len(rows), batch_size):
+            model.predict_batch(rows[start : start + batch_size])
+
+    elapsed, _ = time_call(predict_single, repeat=repeat)
+    results["predict_single_per_row_s"] = elapsed / len(rows)
+    elapsed, _ = time_call(predict_batched, repeat=repeat)
+    results["predict_batch_per_row_s"] = elapsed / len(rows)
+
+    return results, model_path, rows
+
+
+def bench_diagnose(model_path, rows, repeat):
+    """End-to-end /api/diagnose through Flask's test client"""
+    # The app reads these at import time or model load; no database, no
+    # response cache and no ranking cache, so every request runs inference
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["DIAGNOSE_CACHE_SIZE"] = "0"
+    os.environ["RANKING_CACHE_SIZE"] = "0"
+    os.environ["MODEL_PATH"] = model_path
+    import app
+
+    if not app.registry.load(model_path):
+        raise RuntimeError(f"Could not load {model_path}: {app.registry.last_error}")
+    client = app.app.test_client()
+
+    def run():
+        for row in rows:
+            response = client.post("/api/diagnose", json=row)
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/diagnose returned {response.status_code}")
+
+    elapsed, _ = time_call(run, repeat=repeat)
+    return {
+        "diagnose_per_request_s": elapsed / len(rows),
+        "diagnose_rps": len(rows) / elapsed,
+    }
+
+
+def run_suite(args):
+    source = pd.read_csv(args.data)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in (int(size) for size in args.sizes.split(",")):
+            csv_path = os.path.join(workdir, f"dataset_{n_rows}.csv")
+            resample(source, n_rows).to_csv(csv_path, index=False)
+
+            for encoding in args.encodings.split(","):
+                name = f"{encoding}/{n_rows}"
+                print(f"Benchmarking {name}...", file=sys.stderr)
+                stats, model_path, rows = bench_model(
+                    csv_path, encoding, args.predictions, args.batch_size, args.repeat, workdir
+                )
+                stats.update(bench_diagnose(model_path, rows, args.repeat))
+                results[name] = stats
+
+    import sklearn
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def is_timed(metric):
+    return metric.endswith("_s") or metric.endswith(RATE_SUFFIX)
+
+
+def compare(baseline, current, threshold):
+    """Return one row per metric present in both runs, flagging regressions"""
+    rows = []
+    for name, stats in current["results"].items():
+        before = baseline["results"].get(name, {})
+        for metric, value in stats.items():
+            old = before.get(metric)
+            if not is_timed(metric) or not old or value is None:
+                continue
+
+            # Express every change as a slowdown factor (>1 means worse)
+            slowdown = old / value if metric.endswith(RATE_SUFFIX) else value / old
+            rows.append(
+                {
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": value,
+                    "slowdown": slowdown,
+                    "regression": slowdown > 1 + threshold,
+                }
+            )
+    return rows
+
+
+def print_results(report):
+    print(f"{'benchmark':<16} {'metric':<28} {'value':>14}")
+    for name, stats in report["results"].items():
+        for metric, value in stats.items():
+            print(f"{name:<16} {metric:<28} {value:>14.6g}")
+
+
+def print_comparison(rows):
+    print(f"{'benchmark':<16} {'metric':<28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['benchmark']:<16} {row['metric']:<28} {row['baseline']:>12.6g} "
+            f"{row['current']:>12.6g} {(row['slowdown'] - 1) * 100:>+7.1f}%{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="dataset_penyakit_10000_cleaned.csv")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--encodings", default="label")
+    parser.add_argument("--predictions", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument(
+        "--compare",
+        nargs="+",
+        metavar="RESULTS",
+        help="BASELINE [CURRENT]: compare two result files, or run and compare",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown reported as a regression (0.10 = 10%%)",
+    )
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline and at most one current result file")
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1]) as f:
+            report = json.load(f)
+    else:
+        report = run_suite(args)
+        print_results(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print()
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
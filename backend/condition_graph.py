@@ -0,0 +1,178 @@
+import csv
+
+import numpy as np
+
+from ml_model import split_tokens
+from recommendations import condition_key
+
+SOURCE_COLUMN = "nama_penyakit"
+MATCHED_COLUMN = "matched_penyakit"
+OUTCOME_COLUMN = "penyakit_perkembangan"
+
+# Edge sets stored as CSR arrays, keyed by the name used in the artifact
+EDGE_KINDS = ("cooccurrence", "progression", "preceded_by")
+
+
+def _csr(edges, n_nodes):
+    """(indptr, indices, weights) with each row's neighbors by weight, heaviest first"""
+    if edges:
+        src, dst, weights = (np.array(part) for part in zip(*edges))
+    else:
+        src = dst = weights = np.empty(0, dtype=np.int64)
+
+    order = np.lexsort((dst, -weights, src))
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), weights[order].astype(np.int32)
+
+
+class ConditionGraphBuilder:
+    """Accumulates edge counts from one or more dataset frames.
+
+    Co-occurrence edges link a row's ``nama_penyakit`` with each disease in
+    its ``matched_penyakit`` list (in both directions); progression edges
+    point from ``nama_penyakit`` to the row's ``penyakit_perkembangan``.
+    Frames can be added chunk by chunk, so streaming training can build
+    the same graph as in-memory training.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.cooccurrence = {}
+        self.progression = {}
+
+    @staticmethod
+    def supports(columns):
+        return all(col in columns for col in (SOURCE_COLUMN, MATCHED_COLUMN, OUTCOME_COLUMN))
+
+    def _node(self, name):
+        return self.nodes.setdefault(name, len(self.nodes))
+
+    def add(self, frame):
+        import pandas as pd
+
+        sources = frame[SOURCE_COLUMN].astype(str).str.strip().to_numpy()
+        outcomes = frame[OUTCOME_COLUMN].astype(str).str.strip().to_numpy()
+
+        tokens = split_tokens(frame[MATCHED_COLUMN])
+        matched = pd.DataFrame(
+            {"source": sources[tokens.index.to_numpy()], "matched": tokens.to_numpy()}
+        )
+        pairs = pd.DataFrame({"source": sources, "outcome": outcomes})
+        self._add_counts(
+            matched.groupby(["source", "matched"], sort=False).size().items(),
+            pairs.groupby(["source", "outcome"], sort=False).size().items(),
+        )
+
+    def add_csv(self, data_path):
+        """Add a dataset CSV, reading just the graph's columns with the csv module.
+
+        Gives the same graph as add() on the whole file without importing
+        pandas. Returns False if the file lacks the graph's columns.
+        """
+        matched = {}
+        progression = {}
+        with open(data_path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if not self.supports(reader.fieldnames or ()):
+                return False
+
+            for row in reader:
+                source = row[SOURCE_COLUMN].strip()
+                for token in row[MATCHED_COLUMN].split(","):
+                    token = token.strip()
+                    if token:
+                        matched[source, token] = matched.get((source, token), 0) + 1
+                pair = (source, row[OUTCOME_COLUMN].strip())
+                progression[pair] = progression.get(pair, 0) + 1
+
+        self._add_counts(matched.items(), progression.items())
+        return True
+
+    def _add_counts(self, matched, progression):
+        """Add ((source, matched), count) and ((source, outcome), count) pairs"""
+        for (source, other), count in matched:
+            if source == other:
+                continue
+            a, b = self._node(source), self._node(other)
+            for edge in ((a, b), (b, a)):
+                self.cooccurrence[edge] = self.cooccurrence.get(edge, 0) + count
+
+        for (source, outcome), count in progression:
+            edge = (self._node(source), self._node(outcome))
+            self.progression[edge] = self.progression.get(edge, 0) + count
+
+    def build(self):
+        n_nodes = len(self.nodes)
+        arrays = {"names": list(self.nodes)}
+        edge_lists = {
+            "cooccurrence": [(a, b, w) for (a, b), w in self.cooccurrence.items()],
+            "progression": [(a, b, w) for (a, b), w in self.progression.items()],
+            "preceded_by": [(b, a, w) for (a, b), w in self.progression.items()],
+        }
+        for kind, edges in edge_lists.items():
+            indptr, indices, weights = _csr(edges, n_nodes)
+            arrays[f"{kind}_indptr"] = indptr
+            arrays[f"{kind}_indices"] = indices
+            arrays[f"{kind}_weights"] = weights
+        return ConditionGraph(arrays)
+
+
+class ConditionGraph:
+    """Read-only condition graph held as CSR arrays.
+
+    ``arrays`` is a plain dict of numpy arrays plus the node names, which is
+    also how it is stored in the model artifact, so a memory-mapped load
+    shares the arrays between workers. Neighbors are pre-sorted by weight,
+    so a query is a dict lookup and an array slice.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.names = arrays["names"]
+        self._ids = {condition_key(name): node for node, name in enumerate(self.names)}
+
+    def __contains__(self, name):
+        return condition_key(name) in self._ids
+
+    def name(self, name):
+        """Canonical spelling of a condition name, or None if unknown"""
+        node = self._ids.get(condition_key(name))
+        return None if node is None else self.names[node]
+
+    def neighbors(self, name, kind, limit=10):
+        """[(name, weight, share of the node's total weight)] for one edge kind"""
+        node = self._ids.get(condition_key(name))
+        if node is None:
+            return []
+
+        indptr = self.arrays[f"{kind}_indptr"]
+        start, end = indptr[node], indptr[node + 1]
+        indices = self.arrays[f"{kind}_indices"][start:end]
+        weights = self.arrays[f"{kind}_weights"][start:end]
+        total = int(weights.sum())
+
+        return [
+            (self.names[int(other)], int(weight), round(int(weight) / total, 4))
+            for other, weight in zip(indices[:limit], weights[:limit])
+        ]
+
+    def related(self, name, limit=10):
+        def as_dicts(kind, share_name):
+            return [
+                {"condition": other, "weight": weight, share_name: share}
+                for other, weight, share in self.neighbors(name, kind, limit)
+            ]
+
+        return {
+            "condition": self.name(name),
+            "related": as_dicts("cooccurrence", "share"),
+            "progressions": as_dicts("progression", "probability"),
+            "precededBy": as_dicts("preceded_by", "share"),
+        }
+
+    def stats(self):
+        return {
+            "nodes": len(self.names),
+            **{f"{kind}_edges": len(self.arrays[f"{kind}_indices"]) for kind in EDGE_KINDS},
+        }
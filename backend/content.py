@@ -0,0 +1,191 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from cache import LRUCache
+
+# A serialized detail response; the validators are computed once per entry
+CachedEntry = namedtuple("CachedEntry", ["body", "etag", "last_modified"])
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def encode_cursor(row):
+    """Opaque cursor pointing just past ``row`` in (created_at, id) order"""
+    created_at = row["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+
+class ContentStore:
+    """Read-through cached access to one content table (blog posts or guides).
+
+    Lists use keyset pagination on ``(created_at, id)`` so a page costs the
+    same no matter how deep it is, and only select the list columns, so
+    large bodies such as ``content`` are never read for list views. Single
+    rows are cached as serialized JSON with their ETag and Last-Modified.
+    Entries expire after ``ttl`` seconds and are dropped by ``invalidate``.
+
+    The caches live in each worker process, so ``invalidate`` only affects
+    the worker it runs in; other workers catch up when their entries expire.
+    """
+
+    def __init__(
+        self,
+        table,
+        list_columns,
+        detail_columns,
+        engine_getter,
+        cache_size=1024,
+        ttl=60.0,
+    ):
+        self.table = table
+        self.list_columns = tuple(list_columns)
+        self.detail_columns = tuple(detail_columns)
+        self.engine_getter = engine_getter
+        self.items = LRUCache(maxsize=cache_size, ttl=ttl)
+        self.pages = LRUCache(maxsize=cache_size, ttl=ttl)
+
+    @property
+    def available(self):
+        return self.engine_getter() is not None
+
+    def project(self, fields, allowed):
+        """Columns to select: the requested subset of ``allowed``, or all of it"""
+        if not fields:
+            return allowed
+        requested = {name.strip() for name in fields.split(",")}
+        # id and created_at are always needed for cursors
+        return tuple(c for c in allowed if c in requested or c in ("id", "created_at"))
+
+    def list_page(self, limit=20, cursor=None, category=None, fields=None):
+        """Return ``(rows, next_cursor, total)``; next_cursor is None on the last page.
+
+        The total is cached with the page, so a cached page costs no query
+        at all, and a missed page reuses the category's cached count.
+        """
+        columns = self.project(fields, self.list_columns)
+        key = (columns, limit, cursor, category)
+        return self.pages.get_or_set(
+            key, lambda: (*self._query_page(columns, limit, cursor, category), self.count(category))
+        )
+
+    def count(self, category=None):
+        """Number of rows, optionally in one category (cached like a page)"""
+        return self.pages.get_or_set(("count", category), lambda: self._query_count(category))
+
+    def _query_count(self, category):
+        from sqlalchemy import text
+
+        where = "WHERE category = :category" if category else ""
+        query = text(f"SELECT count(*) FROM {self.table} {where}")
+        with self.engine_getter().connect() as conn:
+            return conn.execute(query, {"category": category} if category else {}).scalar()
+
+    def _query_page(self, columns, limit, cursor, category):
+        from sqlalchemy import text
+
+        conditions = []
+        params = {"limit": limit + 1}
+        if category:
+            conditions.append("category = :category")
+            params["category"] = category
+        if cursor:
+            params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+            conditions.append("(created_at, id) < (:cursor_created_at, :cursor_id)")
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = text(
+            f"SELECT {', '.join(columns)} FROM {self.table} {where} "
+            "ORDER BY created_at DESC, id DESC LIMIT :limit"
+        )
+
+        with self.engine_getter().connect() as conn:
+            rows = [dict(row) for row in conn.execute(query, params).mappings()]
+
+        # One extra row tells us whether another page exists
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        rows = json.loads(json.dumps(rows[:limit], default=_json_default))
+        return rows, next_cursor
+
+    def get(self, row_id, fields=None):
+        """Return the cached detail entry for ``row_id``, or None if it doesn't exist"""
+        columns = self.project(fields, self.detail_columns)
+        key = (row_id, columns)
+        entry = self.items.get(key)
+        if entry is None:
+            entry = self._query_row(row_id, columns)
+            if entry is not None:
+                self.items.set(key, entry)
+        return entry
+
+    def _query_row(self, row_id, columns):
+        from sqlalchemy import text
+
+        # updated_at is always read for Last-Modified, even if not returned
+        selected = columns if "updated_at" in columns else columns + ("updated_at",)
+        query = text(f"SELECT {', '.join(selected)} FROM {self.table} WHERE id = :id")
+
+        with self.engine_getter().connect() as conn:
+            row = conn.execute(query, {"id": row_id}).mappings().first()
+        if row is None:
+            return None
+
+        row = dict(row)
+        last_modified = _to_datetime(row["updated_at"])
+        if "updated_at" not in columns:
+            del row["updated_at"]
+
+        body = json.dumps(row, default=_json_default).encode()
+        return CachedEntry(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            last_modified=last_modified,
+        )
+
+    def invalidate(self, row_id=None):
+        """Drop cached pages and either one row (all projections) or every row"""
+        self.pages.clear()
+        if row_id is None:
+            self.items.clear()
+            return
+
+        for key in self.items.keys():
+            if key[0] == row_id:
+                self.items.invalidate(key)
+
+    def stats(self):
+        return {"items": self.items.stats(), "pages": self.pages.stats()}
@@ -0,0 +1,47 @@
+import os
+import threading
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def pool_options(database_url):
+    """Connection pool settings for create_engine, read from the environment.
+
+    SQLite's pools don't take sizes, so it only gets pre-ping.
+    """
+    options = {"pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1"}
+    if database_url.startswith("sqlite"):
+        return options
+
+    options.update(
+        pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        # Recycle before managed Postgres proxies drop idle connections
+        pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    )
+    return options
+
+
+def get_engine():
+    """Return the shared SQLAlchemy engine for DATABASE_URL, or None if unset.
+
+    SQLAlchemy is imported on first use so processes that never touch the
+    database don't pay for it. The engine keeps a pool of connections that
+    is reused across requests.
+    """
+    global _engine
+
+    if _engine is None:
+        database_url = os.environ.get("DATABASE_URL")
+        if not database_url:
+            return None
+
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+
+                _engine = create_engine(database_url, **pool_options(database_url))
+
+    return _engine
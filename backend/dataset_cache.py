@@ -0,0 +1,128 @@
+import hashlib
+import os
+
+import numpy as np
+
+from atomic_file import atomic_write
+
+# Bump when the layout of cached arrays changes so old entries are ignored
+CACHE_VERSION = 1
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def values_array(values):
+    """An array of Python values that round-trips through .npz without pickle.
+
+    Mixed types (e.g. strings plus a NaN) would be silently coerced by
+    np.array, so they get an object array instead, which store() refuses.
+    """
+    types = {type(value) for value in values}
+    if len(types) == 1 and types <= {str, bool, int, float}:
+        return np.array(values)
+    return np.array(values, dtype=object)
+
+
+class DatasetCache:
+    """Encoded training data stored as .npz files, keyed by the CSV's content hash.
+
+    An entry is a flat dict of numpy arrays (what they hold is up to the
+    caller) and is only ever read back for a CSV with the same SHA-256 and
+    the same ``variant`` (e.g. the encoding). Writing an entry evicts the
+    entries of older versions of the same CSV, and the oldest entries
+    overall beyond ``max_entries``. Object arrays are never written, so
+    entries load with ``allow_pickle=False``.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=8):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _dir(self, data_path):
+        return self.cache_dir or os.path.join(os.path.dirname(os.path.abspath(data_path)), ".dataset_cache")
+
+    def _prefix(self, data_path):
+        stem = os.path.splitext(os.path.basename(data_path))[0]
+        return f"{stem}-v{CACHE_VERSION}-"
+
+    def path_for(self, data_path, digest, variant):
+        return os.path.join(
+            self._dir(data_path), f"{self._prefix(data_path)}{digest[:16]}-{variant}.npz"
+        )
+
+    def lookup(self, data_path, variant):
+        """Return (digest, arrays); arrays is None on a miss"""
+        digest = file_digest(data_path)
+        path = self.path_for(data_path, digest, variant)
+
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError):
+            return digest, None
+
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return digest, arrays
+
+    def store(self, data_path, digest, variant, arrays):
+        """Write an entry; returns False if it wasn't written.
+
+        Arrays that can't be stored without pickle are refused, and I/O
+        errors (e.g. an unwritable cache dir) are logged, never raised: a
+        failed write is just a miss next time.
+        """
+        if any(np.asarray(array).dtype == object for array in arrays.values()):
+            return False
+
+        path = self.path_for(data_path, digest, variant)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, lambda f: np.savez(f, **arrays), suffix=".tmp.npz")
+            self._evict(data_path, digest)
+        except OSError as e:
+            print(f"Dataset cache write failed: {e}")
+            return False
+        return True
+
+    def _evict(self, data_path, digest):
+        cache_dir = self._dir(data_path)
+        prefix = self._prefix(data_path)
+        entries = []
+
+        for name in os.listdir(cache_dir):
+            if not name.endswith(".npz") or name.endswith(".tmp.npz"):
+                continue
+            path = os.path.join(cache_dir, name)
+            # Entries for an older version of this CSV can never be hit again
+            if name.startswith(prefix) and not name.startswith(f"{prefix}{digest[:16]}-"):
+                _remove(path)
+                continue
+            entries.append(path)
+
+        entries.sort(key=_mtime, reverse=True)
+        for path in entries[self.max_entries :]:
+            _remove(path)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,167 @@
+import atexit
+import queue
+import threading
+import time
+
+HISTORY_COLUMNS = (
+    "user_id",
+    "condition",
+    "symptoms",
+    "severity",
+    "duration",
+    "confidence",
+    "recommendations",
+)
+
+
+class HistoryWriter:
+    """Write-behind buffer for diagnosis_history rows.
+
+    ``record`` only appends to a bounded in-memory queue and never waits on
+    the database, so request latency is independent of write latency. A
+    background thread drains the queue and writes each batch as a single
+    multi-row INSERT once ``batch_size`` rows are waiting or
+    ``flush_interval`` seconds have passed. When the queue is full new rows
+    are dropped and counted rather than blocking the request. Whatever is
+    still queued is flushed by ``close``, which also runs at interpreter
+    exit.
+    """
+
+    def __init__(self, engine_getter, max_queue=10000, batch_size=500, flush_interval=1.0):
+        self.engine_getter = engine_getter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._table = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error = None
+        self.last_flush_seconds = None
+
+    @property
+    def enabled(self):
+        return self.engine_getter() is not None
+
+    def record(self, row):
+        """Queue one history row; returns False if it was dropped"""
+        if self._stop.is_set():
+            return False
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait(tuple(row.get(name) for name in HISTORY_COLUMNS))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _collect(self):
+        """Block for the first row, then gather more until the batch fills or time is up"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+        self._drain()
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) == self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _history_table(self):
+        if self._table is None:
+            from sqlalchemy import Column, MetaData, Table
+
+            self._table = Table(
+                "diagnosis_history",
+                MetaData(),
+                *(Column(name) for name in HISTORY_COLUMNS),
+            )
+        return self._table
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            rows = [dict(zip(HISTORY_COLUMNS, values)) for values in batch]
+            with self.engine_getter().begin() as conn:
+                conn.execute(self._history_table().insert().values(rows))
+        except Exception as e:
+            # A failed batch is counted and dropped; retrying could pile up
+            # behind a database that is down
+            with self._stats_lock:
+                self.failed += len(batch)
+                self.last_error = str(e)
+            print(f"Error writing diagnosis history: {e}")
+            return
+
+        with self._stats_lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.last_flush_seconds = time.perf_counter() - started
+
+    def close(self, timeout=10.0):
+        """Stop accepting rows and flush everything still queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_error": self.last_error,
+                "last_flush_seconds": self.last_flush_seconds,
+            }
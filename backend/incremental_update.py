@@ -0,0 +1,390 @@
+"""Fold new diagnosis_history rows into the model without a full retrain.
+
+Only rows past the stored watermark are read, streamed from the database
+in batches. Multi-hot models only: history rows carry just the symptoms,
+and label-encoded models need every feature. Category dictionaries are extended in place (existing
+codes never change), the weight matrix grows for new classes and tokens,
+and gradient descent on the new rows warm-starts from the current
+weights. The result is saved as a new versioned artifact next to
+the model, e.g. model.v3.joblib, and optionally promoted to the model path.
+
+    python incremental_update.py --model model.joblib --promote
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from atomic_file import atomic_write
+from database import get_engine
+from ml_model import HealthRecommendationModel, extend_categorical, softmax, split_value
+from numpy_scorer import NumpyScorer, _is_multinomial, sigmoid
+
+# diagnosis_history column -> model feature; "condition" is the label
+DEFAULT_COLUMN_MAP = {"symptoms": "nama_penyakit"}
+LABEL_COLUMN = "condition"
+
+# SERIAL ids are handed out at insert but become visible at commit, so a
+# row can appear after a higher id was already read. Each run re-reads this
+# many ids below the watermark and skips the ones it has already applied.
+ID_WINDOW = 1000
+
+
+def state_path(model_path):
+    return f"{model_path}.incremental.json"
+
+
+def load_state(model_path):
+    try:
+        with open(state_path(model_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 0, "last_id": 0, "seen_ids": [], "artifact": None}
+
+
+def save_state(model_path, state):
+    atomic_write(state_path(model_path), lambda f: f.write(json.dumps(state, indent=2).encode()))
+
+
+def versioned_path(model_path, version):
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.v{version}{ext}"
+
+
+def stream_history(engine, after_id, columns, batch_size=1000):
+    """Yield lists of history rows with id > after_id, in id order"""
+    from sqlalchemy import text
+
+    selected = ", ".join(["id", LABEL_COLUMN, *columns])
+    query = text(
+        f"SELECT {selected} FROM diagnosis_history WHERE id > :after_id ORDER BY id"
+    )
+
+    with engine.connect() as conn:
+        # Server-side cursor: only batch_size rows are held in memory at a time
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+            query, {"after_id": after_id}
+        )
+        for partition in result.mappings().partitions():
+            yield partition
+
+
+def history_examples(partitions, column_map, seen_ids=()):
+    """(new ids, [(features, label)]) from streamed rows not in seen_ids"""
+    seen_ids = set(seen_ids)
+    ids = []
+    examples = []
+    for partition in partitions:
+        for row in partition:
+            if row["id"] in seen_ids:
+                continue
+            ids.append(row["id"])
+            features = {
+                feature: row[column]
+                for column, feature in column_map.items()
+                if row[column] not in (None, "")
+            }
+            if features and row[LABEL_COLUMN]:
+                examples.append((features, row[LABEL_COLUMN]))
+    return ids, examples
+
+
+class IncrementalUpdater:
+    """Grows a multi-hot model's vocabulary and weights for new examples.
+
+    Features missing from an example encode as zeros.
+    """
+
+    def __init__(self, model):
+        if model.model is None:
+            raise ValueError("Model not trained")
+        if model.encoding != "multihot":
+            raise ValueError(
+                "Incremental updates need a multi-hot model; "
+                f"retrain with train_model.py --encoding multihot (this one is {model.encoding}-encoded)"
+            )
+        if np.asarray(model.model.coef_).shape[0] == 1:
+            raise ValueError("Incremental updates need a multi-class model")
+
+        self.model = model
+        estimator = model.model
+        self.coef = np.array(estimator.coef_, dtype=np.float64)
+        self.intercept = np.array(estimator.intercept_, dtype=np.float64)
+        self.classes = np.array(estimator.classes_)
+        self.multinomial = _is_multinomial(estimator)
+        self.dtype = getattr(estimator, "dtype", np.dtype("float64"))
+
+    def extend(self, examples):
+        """Add unseen values and labels, then resize the weights to match.
+
+        Returns (new feature values, new classes).
+        """
+        model = self.model
+        old_offsets = list(model.feature_offsets)
+        old_sizes = [1 if encoder is None else len(encoder) for encoder in model.feature_encoders]
+
+        new_values = 0
+        for colname, encoder in zip(model.feature_columns, model.feature_encoders):
+            if encoder is None:
+                continue
+            values = []
+            for features, _ in examples:
+                if colname not in features:
+                    continue
+                value = features[colname]
+                values.extend(split_value(value) if model._is_multi_value(colname) else [value])
+            before = len(encoder)
+            extend_categorical(encoder, np.array(values, dtype=object))
+            new_values += len(encoder) - before
+
+        # The target dict maps code -> name; new names get the next codes
+        decode = model.cat_value_dicts[model.final_colname]
+        encode = {name: code for code, name in decode.items()}
+        before = len(encode)
+        extend_categorical(encode, np.array([label for _, label in examples], dtype=object))
+        new_classes = [code for code in range(before, len(encode))]
+        for name, code in encode.items():
+            decode[code] = name
+
+        model._build_inference_schema(model.feature_columns)
+
+        if new_values:
+            # Each feature's block keeps its old columns; new tokens follow them
+            coef = np.zeros((self.coef.shape[0], model.n_design_columns))
+            for old_offset, size, new_offset in zip(old_offsets, old_sizes, model.feature_offsets):
+                coef[:, new_offset : new_offset + size] = self.coef[:, old_offset : old_offset + size]
+            self.coef = coef
+
+        if new_classes:
+            # New classes start with zero weights and the lowest existing bias
+            self.coef = np.vstack([self.coef, np.zeros((len(new_classes), self.coef.shape[1]))])
+            self.intercept = np.concatenate(
+                [self.intercept, np.full(len(new_classes), self.intercept.min())]
+            )
+            self.classes = np.concatenate([self.classes, new_classes]).astype(self.classes.dtype)
+
+        return new_values, len(new_classes)
+
+    def encode(self, examples):
+        """Design matrix and class indices for the examples the model can encode"""
+        model = self.model
+        encode = {name: code for code, name in model.cat_value_dicts[model.final_colname].items()}
+        class_index = {code: idx for idx, code in enumerate(self.classes.tolist())}
+
+        rows, y = [], []
+        for features, label in examples:
+            row, error = model.encode_features(features, allow_missing=True)
+            if error is None:
+                rows.append(row)
+                y.append(class_index[encode[label]])
+
+        if not rows:
+            return None, np.empty(0, dtype=np.intp)
+        return model.design_matrix_from_rows(rows), np.array(y, dtype=np.intp)
+
+    def _probabilities(self, x, coef, intercept):
+        scores = x @ coef.T + intercept
+        return softmax(scores) if self.multinomial else sigmoid(scores)
+
+    def fit(
+        self,
+        x,
+        y,
+        min_steps=200,
+        max_epochs=100,
+        learning_rate=0.5,
+        l2=1e-3,
+        tol=1e-4,
+        batch_size=256,
+        random_state=42,
+    ):
+        """Mini-batch gradient descent on the logistic loss, from the current weights.
+
+        Runs at least ``min_steps`` updates (a small delta is only a few
+        batches per epoch) and then stops once an epoch improves the loss by
+        less than ``tol``, or after ``max_epochs``. The L2 penalty pulls
+        towards the starting weights rather than zero, so what the model
+        knew about classes missing from the delta is kept. Returns the
+        number of epochs run.
+        """
+        rng = np.random.default_rng(random_state)
+        coef = self.coef.copy()
+        anchor = self.coef
+        intercept = self.intercept.copy()
+
+        steps = 0
+        previous_loss = np.inf
+        for epoch in range(1, max_epochs + 1):
+            order = rng.permutation(len(y))
+            for start in range(0, len(y), batch_size):
+                batch = order[start : start + batch_size]
+                xb, yb = x[batch], y[batch]
+
+                # d(loss)/d(scores) is p - onehot(y) for softmax and for OvR sigmoids
+                grad = self._probabilities(xb, coef, intercept)
+                grad[np.arange(len(batch)), yb] -= 1
+                grad /= len(batch)
+
+                coef -= learning_rate * (np.asarray((xb.T @ grad).T) + l2 * (coef - anchor))
+                intercept -= learning_rate * grad.sum(axis=0)
+                steps += 1
+
+            loss = self._log_loss(x, y, coef, intercept)
+            if steps >= min_steps and previous_loss - loss < tol:
+                break
+            previous_loss = loss
+
+        self.coef, self.intercept = coef, intercept
+        return epoch
+
+    def _log_loss(self, x, y, coef, intercept):
+        proba = self._probabilities(x, coef, intercept)
+        if not self.multinomial:
+            proba /= proba.sum(axis=1, keepdims=True)
+        return float(-np.log(np.maximum(proba[np.arange(len(y)), y], 1e-15)).mean())
+
+    def accuracy(self, x, y):
+        predicted = (x @ self.coef.T + self.intercept).argmax(axis=1)
+        return round(float((predicted == y).mean()) * 100, 1)
+
+    def apply(self):
+        """Install the updated weights as the model's (NumPy) estimator"""
+        self.model.model = NumpyScorer(
+            self.coef, self.intercept, self.classes, multinomial=self.multinomial, dtype=self.dtype
+        )
+        self.model.prediction_table = None
+        self.model.ranking_cache.clear()
+        # The holdout accuracy from training no longer describes these weights
+        self.model.accuracy = None
+        self.model.most_important_feature = self.model.get_most_important_feature()
+
+
+def run_update(
+    model_path,
+    engine,
+    column_map=DEFAULT_COLUMN_MAP,
+    batch_size=1000,
+    min_steps=200,
+    learning_rate=0.5,
+    promote=False,
+):
+    """Apply every history row after the watermark; returns the new artifact path or None.
+
+    Raises ValueError for a model that can't be updated, before anything
+    is read or the state file is touched.
+    """
+    started = time.perf_counter()
+    state = load_state(model_path)
+    base_path = state.get("artifact") or model_path
+    if not os.path.exists(base_path):
+        base_path = model_path
+
+    model = HealthRecommendationModel()
+    if not model.load_model(base_path):
+        raise FileNotFoundError(f"Model file not found: {base_path}")
+    updater = IncrementalUpdater(model)
+
+    ids, examples = history_examples(
+        stream_history(engine, max(state["last_id"] - ID_WINDOW, 0), list(column_map), batch_size),
+        column_map,
+        state.get("seen_ids", ()),
+    )
+    if not ids:
+        print(f"No new diagnosis history after id {state['last_id']}")
+        return None
+
+    last_id = max(state["last_id"], max(ids))
+    seen_ids = sorted(
+        id_ for id_ in set(state.get("seen_ids", ())) | set(ids) if id_ > last_id - ID_WINDOW
+    )
+    new_values, new_classes = updater.extend(examples)
+    x, y = updater.encode(examples)
+    skipped = len(ids) - len(y)
+
+    if not len(y):
+        # Rows without symptoms or a condition; only move the watermark past them
+        save_state(
+            model_path,
+            {**state, "last_id": last_id, "seen_ids": seen_ids, "updated_at": time.time()},
+        )
+        print(f"None of the {len(ids)} new rows are usable; model unchanged")
+        return None
+
+    before = updater.accuracy(x, y)
+    epochs = updater.fit(x, y, min_steps=min_steps, learning_rate=learning_rate)
+    after = updater.accuracy(x, y)
+    print(f"Accuracy on the new rows: {before}% before, {after}% after ({epochs} epochs)")
+    updater.apply()
+
+    version = state["version"] + 1
+    output_path = versioned_path(model_path, version)
+    model.save_model(output_path)
+
+    save_state(
+        model_path,
+        {
+            "version": version,
+            "last_id": last_id,
+            "seen_ids": seen_ids,
+            "artifact": output_path,
+            "updated_at": time.time(),
+            "rows": len(y),
+            "skipped_rows": skipped,
+            "delta_accuracy": after,
+        },
+    )
+
+    if promote:
+        def copy_artifact(f):
+            with open(output_path, "rb") as src:
+                shutil.copyfileobj(src, f)
+
+        atomic_write(model_path, copy_artifact)
+
+    print(
+        f"Applied {len(y)} rows ({skipped} skipped, {new_values} new feature values, "
+        f"{new_classes} new classes) in {time.perf_counter() - started:.2f}s"
+    )
+    print(f"Model v{version} saved to '{output_path}'" + (f" and promoted to '{model_path}'" if promote else ""))
+    return output_path
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", "model.joblib"))
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows fetched per round trip")
+    parser.add_argument(
+        "--min-steps", type=int, default=200, help="Fewest gradient steps, however small the delta"
+    )
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument(
+        "--promote", action="store_true", help="Also replace --model with the new version"
+    )
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if engine is None:
+        sys.exit("DATABASE_URL is not set")
+
+    try:
+        run_update(
+            args.model,
+            engine,
+            batch_size=args.batch_size,
+            min_steps=args.min_steps,
+            learning_rate=args.learning_rate,
+            promote=args.promote,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,392 @@
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
 import joblib
 import os
+import time
+
+from atomic_file import atomic_write
+from cache import LRUCache
+
+# pandas, scipy and sklearn are imported inside the functions that need them.
+# Serving a loaded model only needs numpy (plus whatever the unpickled
+# estimator imports itself), which keeps worker start-up time and RSS down.
+
+# Columns holding comma-separated lists, e.g. "Kanker Kolorektal, Campak"
+MULTI_VALUE_COLUMNS = ("matched_penyakit", "obat_pertolongan_pertama")
+ENCODINGS = ("label", "multihot")
+
+
+def encode_categorical(values):
+    """Label-encode a column with codes assigned in order of first appearance.
+
+    Returns the codes as the smallest integer dtype that fits, plus the
+    value -> code dict. Missing values are kept as their own category.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values, sort=False, use_na_sentinel=False)
+    codes = codes.astype(np.min_scalar_type(max(len(uniques) - 1, 0)))
+    return codes, {value: code for code, value in enumerate(uniques.tolist())}
+
+
+def extend_categorical(mapping, values):
+    """Add unseen values to a value -> code dict without renumbering old ones"""
+    import pandas as pd
+
+    for value in pd.unique(values).tolist():
+        if value not in mapping:
+            mapping[value] = len(mapping)
+    return mapping
+
+
+def is_numeric_column(values):
+    return isinstance(values.values[0], (np.integer, float))
+
+
+def split_tokens(values):
+    """Explode a column of comma-separated lists into stripped tokens.
+
+    The result is indexed by row position so it can be used to place
+    tokens in a sparse matrix.
+    """
+    tokens = values.reset_index(drop=True).dropna().astype(str).str.split(",")
+    tokens = tokens.explode().str.strip()
+    return tokens[tokens != ""]
+
+
+def split_value(value):
+    """Split one multi-value input (list or comma-separated string) into tokens"""
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+
+    tokens = (str(token).strip() for token in value)
+    return list(dict.fromkeys(token for token in tokens if token))
+
+
+def lookup_code(encoder, value):
+    """Code of value in a value -> code dict, or None if unknown or unhashable"""
+    try:
+        return encoder.get(value)
+    except TypeError:
+        return None
+
+
+def to_float(value):
+    """A numeric input as float, or None if it can't be converted"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def softmax(logits):
+    z = logits - logits.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+def top_k_classes(proba, k):
+    """Indices and probabilities of the k most likely classes per row, best first.
+
+    Uses argpartition so only the k winners are sorted, not every class.
+    """
+    if k == 1:
+        top = proba.argmax(axis=1)[:, None]
+    else:
+        top = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+    top_proba = np.take_along_axis(proba, top, axis=1)
+    order = np.argsort(-top_proba, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_proba, order, axis=1)
+
+
+def condition_graph_builder(columns):
+    """A builder for the condition graph, or None if the dataset lacks its columns"""
+    # Imported here because condition_graph itself imports from this module
+    from condition_graph import ConditionGraphBuilder
+
+    return ConditionGraphBuilder() if ConditionGraphBuilder.supports(columns) else None
 
 
 class HealthRecommendationModel:
-    def __init__(self, data_path=None):
+    def __init__(
+        self,
+        data_path=None,
+        encoding="label",
+        multi_value_columns=MULTI_VALUE_COLUMNS,
+        ranking_cache_size=4096,
+    ):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}")
+
+        # "label" feeds one integer code per column to the classifier;
+        # "multihot" one-hot encodes categories and splits the comma-separated
+        # columns into tokens, producing a sparse CSR design matrix
+        self.encoding = encoding
+        self.multi_value_columns = tuple(multi_value_columns)
         self.model = None
         self.cat_value_dicts = {}
         self.final_colname = None
+        self.feature_columns = []
+        self.feature_encoders = []
+        self.feature_offsets = []
+        self.n_design_columns = 0
         self.data = None
+        self.design_matrix = None
         self.accuracy = None
         self.most_important_feature = None
+        self.prediction_table = None
+        self.training_seconds = None
+        # Co-occurrence/progression graph between conditions, if the dataset has one
+        self.condition_graph = None
+        # Softmax temperature fitted on the holdout; None means raw predict_proba
+        self.temperature = None
+        # Memoized rankings for frequent inputs, keyed by (encoded row, k)
+        self.ranking_cache = LRUCache(maxsize=ranking_cache_size)
 
         if data_path and os.path.exists(data_path):
             self.load_and_prepare_data(data_path)
             self.train_model()
 
-    def load_and_prepare_data(self, data_path):
+    def load_and_prepare_data(self, data_path, use_cache=None):
+        """Load and encode the dataset.
+
+        The encoded columns are cached next to the CSV, keyed by its SHA-256,
+        so later runs on an unchanged CSV skip parsing and encoding. The cache
+        is on unless ``use_cache`` is False or DATASET_CACHE=0.
+        """
+        if use_cache is None:
+            use_cache = os.environ.get("DATASET_CACHE", "1") == "1"
+
+        if use_cache:
+            from dataset_cache import DatasetCache
+
+            cache = DatasetCache(os.environ.get("DATASET_CACHE_DIR"))
+            digest, arrays = cache.lookup(data_path, self._cache_variant())
+            if arrays is not None:
+                self._restore_prepared(arrays)
+                return
+
+        self._prepare_from_csv(data_path)
+
+        if use_cache:
+            cache.store(data_path, digest, self._cache_variant(), self._prepared_arrays())
+
+    def _cache_variant(self):
+        if self.encoding == "multihot":
+            return "multihot-" + "+".join(sorted(self.multi_value_columns))
+        return self.encoding
+
+    def _prepared_arrays(self):
+        """Everything _prepare_from_csv produced, as a flat dict of numpy arrays"""
+        from dataset_cache import values_array
+
+        arrays = {
+            "columns": values_array(self.feature_columns + [self.final_colname]),
+        }
+        for colname in self.data.columns:
+            arrays[f"codes:{colname}"] = self.data[colname].to_numpy()
+        for colname, mapping in self.cat_value_dicts.items():
+            # Codes are 0..n-1, so storing values in code order keeps the dict
+            if colname == self.final_colname:
+                values = [mapping[code] for code in range(len(mapping))]
+            else:
+                values = sorted(mapping, key=mapping.get)
+            arrays[f"values:{colname}"] = values_array(values)
+        if self.condition_graph is not None:
+            for name, array in self.condition_graph.arrays.items():
+                arrays[f"graph:{name}"] = values_array(array) if name == "names" else array
+        if self.design_matrix is not None:
+            arrays["design:data"] = self.design_matrix.data
+            arrays["design:indices"] = self.design_matrix.indices
+            arrays["design:indptr"] = self.design_matrix.indptr
+            arrays["design:shape"] = np.array(self.design_matrix.shape)
+        return arrays
+
+    def _restore_prepared(self, arrays):
+        import pandas as pd
+
+        columns = arrays["columns"].tolist()
+        self.final_colname = columns[-1]
+        self.cat_value_dicts = {}
+        for colname in columns:
+            if f"values:{colname}" not in arrays:
+                continue
+            values = arrays[f"values:{colname}"].tolist()
+            if colname == self.final_colname:
+                self.cat_value_dicts[colname] = dict(enumerate(values))
+            else:
+                self.cat_value_dicts[colname] = {value: code for code, value in enumerate(values)}
+
+        self.data = pd.DataFrame(
+            {col: arrays[f"codes:{col}"] for col in columns if f"codes:{col}" in arrays}
+        )
+
+        self.condition_graph = None
+        graph_arrays = {
+            name[len("graph:"):]: array for name, array in arrays.items() if name.startswith("graph:")
+        }
+        if graph_arrays:
+            from condition_graph import ConditionGraph
+
+            graph_arrays["names"] = graph_arrays["names"].tolist()
+            self.condition_graph = ConditionGraph(graph_arrays)
+
+        self._build_inference_schema(columns[:-1])
+
+        if "design:data" in arrays:
+            import scipy.sparse as sp
+
+            self.design_matrix = sp.csr_matrix(
+                (arrays["design:data"], arrays["design:indices"], arrays["design:indptr"]),
+                shape=tuple(arrays["design:shape"]),
+            )
+
+    def _prepare_from_csv(self, data_path):
+        import pandas as pd
+
         # Load dataset
         uncleaned_data = pd.read_csv(data_path)
-        self.data = pd.DataFrame()
 
         # Keep track of categorical columns and their mappings
         self.final_colname = uncleaned_data.columns[len(uncleaned_data.columns) - 1]
+        self.cat_value_dicts = {}
+        columns = {}
 
         # For each column...
-        for colname, colval in uncleaned_data.iteritems():
+        for colname, colval in uncleaned_data.items():
             # Check if column is already numeric
-            if isinstance(colval.values[0], (np.integer, float)):
-                self.data[colname] = uncleaned_data[colname].copy()
+            if is_numeric_column(colval):
+                columns[colname] = colval.copy()
                 continue
 
-            # Handle categorical values
-            new_dict = {}
-            val = 0  # First index per column
-            transformed_col_vals = []  # New numeric datapoints
-
-            # For each item in the column...
-            for row, item in enumerate(colval.values):
-                # If item is not in this column's dictionary...
-                if item not in new_dict:
-                    new_dict[item] = val
-                    val += 1
+            if self._is_multi_value(colname):
+                # Tokens go straight into the sparse design matrix below
+                self.cat_value_dicts[colname] = extend_categorical(
+                    {}, split_tokens(colval)
+                )
+                continue
 
-                # Add numerical value to transformed dataframe
-                transformed_col_vals.append(new_dict[item])
+            # Handle categorical values; codes follow order of first appearance
+            codes, new_dict = encode_categorical(colval)
 
             # Reverse dictionary only for final column (0, 1) => (vals)
             if colname == self.final_colname:
                 new_dict = {value: key for key, value in new_dict.items()}
 
             self.cat_value_dicts[colname] = new_dict
-            self.data[colname] = transformed_col_vals
+            columns[colname] = codes
+
+        self.data = pd.DataFrame(columns, index=uncleaned_data.index)
+        graph_builder = condition_graph_builder(uncleaned_data.columns)
+        if graph_builder is not None:
+            graph_builder.add(uncleaned_data)
+            self.condition_graph = graph_builder.build()
+
+        self._build_inference_schema(
+            [col for col in uncleaned_data.columns if col != self.final_colname]
+        )
+
+        if self.encoding == "multihot":
+            self.design_matrix = self.sparse_design_matrix(uncleaned_data)
+
+    def build_condition_graph(self, data_path):
+        """(Re)build only the condition graph, e.g. for artifacts saved without one.
 
-    def train_model(self):
+        Only the graph's three columns are read, with the csv module, so
+        this neither imports pandas nor writes the dataset cache.
+        """
+        from condition_graph import ConditionGraphBuilder
+
+        builder = ConditionGraphBuilder()
+        if not builder.add_csv(data_path):
+            return False
+        self.condition_graph = builder.build()
+        return True
+
+    def _is_multi_value(self, colname):
+        return self.encoding == "multihot" and colname in self.multi_value_columns
+
+    def sparse_design_matrix(self, frame):
+        """Encode raw rows into the multi-hot CSR matrix using the fitted dicts"""
+        import scipy.sparse as sp
+
+        n_rows = len(frame)
+        blocks = []
+
+        for colname, encoder in zip(self.feature_columns, self.feature_encoders):
+            values = frame[colname].reset_index(drop=True)
+
+            if encoder is None:
+                block = sp.csr_matrix(values.to_numpy(dtype=float).reshape(-1, 1))
+            elif self._is_multi_value(colname):
+                tokens = split_tokens(values)
+                block = sp.csr_matrix(
+                    (
+                        np.ones(len(tokens), dtype=np.float32),
+                        (tokens.index.to_numpy(), tokens.map(encoder).to_numpy()),
+                    ),
+                    shape=(n_rows, len(encoder)),
+                )
+                # A token repeated within one row still counts once
+                block.sum_duplicates()
+                block.data[:] = 1
+            else:
+                block = sp.csr_matrix(
+                    (
+                        np.ones(n_rows, dtype=np.float32),
+                        (np.arange(n_rows), values.map(encoder).to_numpy()),
+                    ),
+                    shape=(n_rows, len(encoder)),
+                )
+
+            blocks.append(block)
+
+        return sp.hstack(blocks, format="csr")
+
+    def _build_inference_schema(self, feature_columns):
+        """Precompute the ordered feature list and per-feature encoders.
+
+        ``feature_encoders[i]`` is the value -> code dict for a categorical
+        feature or ``None`` for a numeric one, so predict never has to look
+        at the training DataFrame.
+        """
+        self.feature_columns = list(feature_columns)
+        self.feature_encoders = [
+            self.cat_value_dicts.get(col) for col in self.feature_columns
+        ]
+
+        # Column ranges of each feature in the multi-hot design matrix
+        self.feature_offsets = []
+        self.n_design_columns = 0
+        for encoder in self.feature_encoders:
+            self.feature_offsets.append(self.n_design_columns)
+            self.n_design_columns += 1 if encoder is None else len(encoder)
+
+    def training_data(self):
+        """Return the prepared (x, y) training arrays for the current encoding"""
         # Select features and prediction; automatically selects last column as prediction
         cols = len(self.data.columns)
         num_features = cols - 1
-        x = self.data.iloc[:, :num_features]
-        y = self.data.iloc[:, num_features:]
+        if self.encoding == "multihot":
+            x = self.design_matrix
+        else:
+            x = self.data.iloc[:, :num_features].values
+        y = self.data.iloc[:, num_features:].values.ravel()
+        return x, y
+
+    def train_model(self, calibrate=False, **model_params):
+        """Fit LogisticRegression on a 75/25 split and score it on the 25%.
+
+        With ``calibrate=True`` a softmax temperature is also fitted on the
+        held-out 25% so the reported probabilities are better calibrated.
+        """
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import train_test_split
+
+        started = time.perf_counter()
+        x, y = self.training_data()
 
         # Split data into training and testing sets
         x_train, x_test, y_train, y_test = train_test_split(
@@ -69,8 +394,8 @@ class HealthRecommendationModel:
         )
 
         # Train the model
-        self.model = LogisticRegression(max_iter=1000)
-        self.model.fit(x_train, y_train.values.ravel())
+        self.model = LogisticRegression(**{"max_iter": 1000, **model_params})
+        self.model.fit(x_train, y_train)
 
         # Evaluate the model
         y_pred = self.model.predict(x_test)
@@ -78,8 +403,191 @@ class HealthRecommendationModel:
 
         self.accuracy = round(metrics.accuracy_score(y_test, y_pred) * 100, 1)
 
+        self.temperature = None
+        if calibrate:
+            self.fit_temperature(x_test, y_test)
+
         # Find most important feature
         self.most_important_feature = self.get_most_important_feature()
+        self.training_seconds = time.perf_counter() - started
+
+    def _logits(self, x):
+        logits = self.model.decision_function(x)
+        if logits.ndim == 1:
+            # Binary models return one margin; softmax([0, z]) == sigmoid(z)
+            logits = np.column_stack([np.zeros_like(logits), logits])
+        return logits
+
+    def fit_temperature(self, x, y):
+        """Fit the softmax temperature that minimizes log loss on (x, y)"""
+        from scipy.optimize import minimize_scalar
+
+        known = np.isin(y, self.model.classes_)
+        logits = self._logits(x[np.flatnonzero(known)])
+        target = np.searchsorted(self.model.classes_, y[known])
+        rows = np.arange(len(target))
+
+        def negative_log_likelihood(log_temperature):
+            z = logits / np.exp(log_temperature)
+            z = z - z.max(axis=1, keepdims=True)
+            log_norm = np.log(np.exp(z).sum(axis=1))
+            return float((log_norm - z[rows, target]).mean())
+
+        result = minimize_scalar(negative_log_likelihood, bounds=(-5, 5), method="bounded")
+        self.temperature = float(np.exp(result.x))
+        self.ranking_cache.clear()
+        return self.temperature
+
+    def predict_proba(self, x):
+        """Class probabilities for a design matrix, temperature-scaled if calibrated"""
+        if self.temperature is None:
+            return self.model.predict_proba(x)
+        return softmax(self._logits(x) / self.temperature)
+
+    def train_streaming(
+        self, data_path, chunksize=50000, holdout_size=10000, epochs=1, random_state=42
+    ):
+        """Train from a CSV in fixed-size chunks so peak memory stays constant.
+
+        The first pass grows the category dictionaries chunk by chunk (the
+        classifier needs the full class list up front). Later passes encode
+        each chunk and feed it to an SGD logistic regression via partial_fit.
+        Accuracy is measured on a reservoir-sampled holdout that is never
+        trained on. ``self.data`` is not populated in this mode. Only the
+        label encoding is supported.
+        """
+        if self.encoding != "label":
+            raise ValueError("Streaming training only supports the label encoding")
+
+        import pandas as pd
+        from sklearn.linear_model import SGDClassifier
+
+        started = time.perf_counter()
+        rng = np.random.default_rng(random_state)
+
+        # Pass 1: category dictionaries, in order of first appearance
+        self.cat_value_dicts = {}
+        self.final_colname = None
+        numeric_columns = set()
+        graph_builder = None
+
+        for chunk in pd.read_csv(data_path, chunksize=chunksize):
+            if self.final_colname is None:
+                self.final_colname = chunk.columns[len(chunk.columns) - 1]
+                columns = list(chunk.columns)
+                numeric_columns = {
+                    col for col, val in chunk.items() if is_numeric_column(val)
+                }
+                graph_builder = condition_graph_builder(columns)
+
+            if graph_builder is not None:
+                graph_builder.add(chunk)
+
+            for colname in columns:
+                if colname not in numeric_columns:
+                    extend_categorical(
+                        self.cat_value_dicts.setdefault(colname, {}), chunk[colname]
+                    )
+
+        if self.final_colname is None:
+            raise ValueError(f"No rows found in {data_path}")
+
+        target_dict = self.cat_value_dicts[self.final_colname]
+        classes = np.arange(len(target_dict))
+        feature_columns = [col for col in columns if col != self.final_colname]
+
+        # SGD is sensitive to feature scale, so codes are divided by the
+        # largest code while fitting and the scale is folded back into coef_
+        # afterwards; the saved model still takes raw codes like train_model's
+        scale = np.array(
+            [
+                1.0 if col in numeric_columns else max(len(self.cat_value_dicts[col]) - 1, 1)
+                for col in feature_columns
+            ]
+        )
+
+        def encode_chunk(chunk):
+            x = np.column_stack(
+                [
+                    chunk[col].to_numpy(dtype=float)
+                    if col in numeric_columns
+                    else chunk[col].map(self.cat_value_dicts[col]).to_numpy()
+                    for col in feature_columns
+                ]
+            )
+            return x / scale, chunk[self.final_colname].map(target_dict).to_numpy()
+
+        # Pass 2+: incremental fit with a fixed-size reservoir holdout
+        self.model = SGDClassifier(loss="log_loss", random_state=random_state)
+        holdout_x = np.empty((holdout_size, len(feature_columns)))
+        holdout_y = np.empty(holdout_size, dtype=np.int64)
+        holdout_rows = np.full(holdout_size, -1, dtype=np.int64)
+        filled = 0
+
+        for epoch in range(epochs):
+            seen = 0
+
+            for chunk in pd.read_csv(data_path, chunksize=chunksize):
+                x, y = encode_chunk(chunk)
+                row_ids = seen + np.arange(len(chunk))
+                seen += len(chunk)
+
+                if epoch > 0:
+                    train = ~np.isin(row_ids, holdout_rows[:filled])
+                    if train.any():
+                        self.model.partial_fit(x[train], y[train], classes=classes)
+                    continue
+
+                # Algorithm R: fill the reservoir, then replace with
+                # probability holdout_size / (row_id + 1); evicted rows are
+                # trained on instead
+                train = np.ones(len(chunk), dtype=bool)
+                take = min(holdout_size - filled, len(chunk))
+                holdout_x[filled : filled + take] = x[:take]
+                holdout_y[filled : filled + take] = y[:take]
+                holdout_rows[filled : filled + take] = row_ids[:take]
+                train[:take] = False
+                filled += take
+
+                slots = rng.integers(0, row_ids[take:] + 1)
+                evicted_x, evicted_y = [], []
+                for offset in np.flatnonzero(slots < holdout_size):
+                    row, slot = take + offset, slots[offset]
+                    evicted_x.append(holdout_x[slot].copy())
+                    evicted_y.append(holdout_y[slot])
+                    holdout_x[slot], holdout_y[slot] = x[row], y[row]
+                    holdout_rows[slot] = row_ids[row]
+                    train[row] = False
+
+                if evicted_x:
+                    x_train = np.vstack([x[train], evicted_x])
+                    y_train = np.concatenate([y[train], evicted_y])
+                else:
+                    x_train, y_train = x[train], y[train]
+
+                if len(y_train):
+                    self.model.partial_fit(x_train, y_train, classes=classes)
+
+        if not hasattr(self.model, "coef_"):
+            raise ValueError("holdout_size leaves no rows to train on")
+        self.model.coef_ /= scale
+
+        # Reverse dictionary only for final column (0, 1) => (vals)
+        self.cat_value_dicts[self.final_colname] = {
+            value: key for key, value in target_dict.items()
+        }
+        self.data = None
+        self.condition_graph = graph_builder.build() if graph_builder is not None else None
+        self._build_inference_schema(feature_columns)
+
+        # Evaluate the model on the holdout sample
+        if filled:
+            y_pred = self.model.predict(holdout_x[:filled] * scale)
+            self.accuracy = round(float((y_pred == holdout_y[:filled]).mean()) * 100, 1)
+
+        # Find most important feature
+        self.most_important_feature = self.get_most_important_feature()
+        self.training_seconds = time.perf_counter() - started
 
     def get_most_important_feature(self):
         if self.model is None:
@@ -88,73 +596,334 @@ class HealthRecommendationModel:
         feats = [abs(x) for x in self.model.coef_[0]]
         max_val = max(feats)
         idx = feats.index(max_val)
-        return self.data.columns[idx]
-
-    def predict(self, features_dict):
-        if self.model is None:
-            return {"error": "Model not trained"}
+        if self.encoding == "multihot":
+            # Map the design-matrix column back to the feature it belongs to
+            idx = int(np.searchsorted(self.feature_offsets, idx, side="right")) - 1
+        return self.feature_columns[idx]
+
+    def encode_features(self, features_dict, allow_missing=False):
+        """Encode one input dict into a feature row, or return an error message.
+
+        With the label encoding the row is a list of feature values; with the
+        multi-hot encoding it is a list of (design column, value) pairs.
+        ``allow_missing`` lets multi-hot rows leave features out (they encode
+        as all zeros); label rows always need every feature.
+        """
+        if self.encoding == "multihot":
+            return self._encode_multi_hot(features_dict, allow_missing)
 
         features = []
 
         # Transform categorical input
-        for colname in self.data.columns:
-            # Skip the target column
-            if colname == self.final_colname:
+        for colname, encoder in zip(self.feature_columns, self.feature_encoders):
+            if colname not in features_dict:
+                return None, f"Missing feature: {colname}"
+
+            value = features_dict[colname]
+            # Lists, dicts and non-numeric strings are rejected, not raised
+            code = to_float(value) if encoder is None else lookup_code(encoder, value)
+            if code is None:
+                return None, f"Invalid value for {colname}: {value}"
+            features.append(code)
+
+        return features, None
+
+    def _encode_multi_hot(self, features_dict, allow_missing=False):
+        entries = []
+
+        for colname, encoder, offset in zip(
+            self.feature_columns, self.feature_encoders, self.feature_offsets
+        ):
+            if colname not in features_dict:
+                if allow_missing:
+                    continue
+                return None, f"Missing feature: {colname}"
+
+            value = features_dict[colname]
+
+            if colname in self.multi_value_columns and encoder is not None:
+                # Any subset of known tokens is accepted
+                for token in split_value(value):
+                    if token not in encoder:
+                        return None, f"Invalid value for {colname}: {token}"
+                    entries.append((offset + encoder[token], 1.0))
                 continue
 
-            if colname in features_dict:
-                value = features_dict[colname]
-
-                # Handle categorical features
-                if colname in self.cat_value_dicts:
-                    if value in self.cat_value_dicts[colname]:
-                        features.append(self.cat_value_dicts[colname][value])
-                    else:
-                        return {"error": f"Invalid value for {colname}: {value}"}
-                else:
-                    # Numeric feature
-                    features.append(float(value))
+            code = to_float(value) if encoder is None else lookup_code(encoder, value)
+            if code is None:
+                return None, f"Invalid value for {colname}: {value}"
+            if encoder is None:
+                entries.append((offset, code))
             else:
-                return {"error": f"Missing feature: {colname}"}
+                entries.append((offset + code, 1.0))
+
+        return entries, None
+
+    def design_matrix_from_rows(self, rows):
+        """Stack encoded rows into the matrix the classifier expects"""
+        if self.encoding != "multihot":
+            return np.array(rows)
 
-        # Predict
-        new_input = [features]
-        result = self.model.predict(new_input)
-        confidence = max(self.model.predict_proba(new_input)[0])
+        import scipy.sparse as sp
 
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        entries = [entry for row in rows for entry in row]
+        indices = np.array([column for column, _ in entries], dtype=np.int64)
+        data = np.array([value for _, value in entries], dtype=float)
+
+        return sp.csr_matrix(
+            (data, indices, indptr), shape=(len(rows), self.n_design_columns)
+        )
+
+    def _format_ranking(self, classes, probabilities):
+        decode = self.cat_value_dicts[self.final_colname]
+        return [
+            {
+                "condition": decode[self.model.classes_[idx]],
+                "probability": round(float(probability), 4),
+            }
+            for idx, probability in zip(classes, probabilities)
+        ]
+
+    def _format_prediction(self, class_idx, confidence):
+        label = self.model.classes_[class_idx]
         return {
-            "condition": self.cat_value_dicts[self.final_colname][result[0]],
-            "confidence": round(confidence, 2),
+            "condition": self.cat_value_dicts[self.final_colname][label],
+            "confidence": round(float(confidence), 2),
             "accuracy": self.accuracy,
             "most_important_feature": self.most_important_feature,
         }
 
-    def save_model(self, model_path="model.joblib"):
+    def build_prediction_table(self, max_bytes=64 * 1024 * 1024, top_k=3, chunk_size=65536):
+        """Precompute predictions for every possible input combination.
+
+        Only possible when all features are categorical. The results are
+        stored in dense arrays indexed by the flattened encoded feature tuple,
+        so predict becomes an array lookup instead of an sklearn call. Returns
+        False (and keeps live inference) if the table would exceed max_bytes.
+        """
+        self.prediction_table = None
+
+        if self.model is None or not self.feature_encoders:
+            return False
+        if self.encoding != "label":
+            return False
+        if any(encoder is None for encoder in self.feature_encoders):
+            return False
+
+        shape = tuple(max(encoder.values()) + 1 for encoder in self.feature_encoders)
+        n_inputs = 1
+        for size in shape:
+            n_inputs *= size
+
+        n_classes = len(self.model.classes_)
+        top_k = max(1, min(top_k, n_classes))
+        class_dtype = np.min_scalar_type(n_classes - 1)
+        n_bytes = n_inputs * top_k * (class_dtype.itemsize + np.dtype(np.float32).itemsize)
+        if n_bytes > max_bytes:
+            return False
+
+        classes = np.empty((n_inputs, top_k), dtype=class_dtype)
+        probabilities = np.empty((n_inputs, top_k), dtype=np.float32)
+
+        # Enumerate the cartesian product in chunks to bound peak memory
+        for start in range(0, n_inputs, chunk_size):
+            flat = np.arange(start, min(start + chunk_size, n_inputs))
+            rows = np.column_stack(np.unravel_index(flat, shape))
+            classes[flat], probabilities[flat] = top_k_classes(self.predict_proba(rows), top_k)
+
+        self.prediction_table = {
+            "shape": shape,
+            "classes": classes,
+            "probabilities": probabilities,
+        }
+        return True
+
+    def _rank_rows(self, rows, k):
+        """Top-k class indices and probabilities for encoded rows, best first"""
+        table = self.prediction_table
+        if table is not None and k <= table["classes"].shape[1]:
+            flat = np.ravel_multi_index(
+                np.asarray(rows, dtype=np.intp).T, table["shape"]
+            )
+            return table["classes"][flat, :k], table["probabilities"][flat, :k]
+
+        return top_k_classes(self.predict_proba(self.design_matrix_from_rows(rows)), k)
+
+    def _clamp_k(self, k):
+        return max(1, min(int(k or 1), len(self.model.classes_)))
+
+    def predict(self, features_dict, timings=None, k=None):
+        """Predict one input.
+
+        With ``k`` the result also carries ``top_k``: the k most likely
+        conditions with their probabilities. Rankings are memoized per
+        encoded input, so frequent inputs skip inference entirely.
+
+        If a ``timings`` dict is passed, the seconds spent encoding the input
+        and running inference are stored under "encode" and "inference".
+        """
+        if self.model is None:
+            return {"error": "Model not trained"}
+
+        started = time.perf_counter()
+        features, error = self.encode_features(features_dict)
+        if timings is not None:
+            encoded = time.perf_counter()
+            timings["encode"] = encoded - started
+        if error:
+            return {"error": error}
+
+        n_top = self._clamp_k(k)
+        key = (tuple(features), n_top)
+        ranking = self.ranking_cache.get(key)
+        if ranking is None:
+            # The first entry is the argmax, i.e. exactly what predict() returns
+            classes, probabilities = self._rank_rows([features], n_top)
+            ranking = (classes[0], probabilities[0])
+            self.ranking_cache.set(key, ranking)
+        if timings is not None:
+            timings["inference"] = time.perf_counter() - encoded
+
+        result = self._format_prediction(ranking[0][0], ranking[1][0])
+        if k:
+            result["top_k"] = self._format_ranking(*ranking)
+        return result
+
+    def predict_batch(self, features_list, k=None):
+        """Predict many inputs with a single predict_proba call.
+
+        Returns one result per input, in order. Inputs that fail validation
+        get an ``{"error": ...}`` entry instead of failing the whole batch.
+        """
+        if self.model is None:
+            return [{"error": "Model not trained"} for _ in features_list]
+
+        results = [None] * len(features_list)
+        rows = []
+        positions = []
+
+        for i, features_dict in enumerate(features_list):
+            if not isinstance(features_dict, dict):
+                results[i] = {"error": "Each input must be an object"}
+                continue
+
+            features, error = self.encode_features(features_dict)
+            if error:
+                results[i] = {"error": error}
+                continue
+
+            rows.append(features)
+            positions.append(i)
+
+        if rows:
+            classes, probabilities = self._rank_rows(rows, self._clamp_k(k))
+
+            for pos, row_classes, row_probabilities in zip(positions, classes, probabilities):
+                results[pos] = self._format_prediction(row_classes[0], row_probabilities[0])
+                if k:
+                    results[pos]["top_k"] = self._format_ranking(row_classes, row_probabilities)
+
+        return results
+
+    def save_model(self, model_path="model.joblib", estimator=None):
+        """Save the artifact; ``estimator`` replaces the fitted model in it if given"""
         if self.model is None:
             return False
 
         model_data = {
-            "model": self.model,
+            "model": self.model if estimator is None else estimator,
             "cat_value_dicts": self.cat_value_dicts,
             "final_colname": self.final_colname,
+            "feature_columns": self.feature_columns,
+            "encoding": self.encoding,
+            "multi_value_columns": self.multi_value_columns,
             "accuracy": self.accuracy,
             "most_important_feature": self.most_important_feature,
+            "training_seconds": self.training_seconds,
+            "temperature": self.temperature,
+            # Stored as plain arrays so load_model(mmap_mode="r") can map them
+            "prediction_table": self.prediction_table,
+            "condition_graph": (
+                self.condition_graph.arrays if self.condition_graph is not None else None
+            ),
         }
 
-        joblib.dump(model_data, model_path)
+        atomic_write(model_path, lambda f: joblib.dump(model_data, f))
+        return True
+
+    def numpy_scorer(self, dtype="float32"):
+        """The fitted model as a NumpyScorer, scoring with plain NumPy"""
+        from numpy_scorer import NumpyScorer
+
+        if isinstance(self.model, NumpyScorer) and self.model.dtype == np.dtype(dtype):
+            return self.model
+        return NumpyScorer.from_estimator(self.model, dtype=dtype)
+
+    def use_numpy_scorer(self, dtype="float32"):
+        """Serve predictions through a NumpyScorer instead of sklearn"""
+        if self.model is None:
+            return False
+
+        self.model = self.numpy_scorer(dtype)
+        self.ranking_cache.clear()
         return True
 
-    def load_model(self, model_path="model.joblib"):
+    def export_scorer(self, model_path, dtype="float32"):
+        """Save an artifact whose model is a NumpyScorer.
+
+        It loads with load_model like any other artifact, but unpickling it
+        needs only numpy, so a worker serving it never imports sklearn.
+        """
+        if self.model is None:
+            return False
+        return self.save_model(model_path, estimator=self.numpy_scorer(dtype))
+
+    def load_model(self, model_path="model.joblib", mmap_mode=None):
+        """Load a saved artifact.
+
+        With ``mmap_mode="r"`` the numpy arrays in the (uncompressed) artifact,
+        such as the coefficients and a saved prediction table, are memory-mapped
+        instead of copied, so every worker on a host shares the same pages.
+        """
         if not os.path.exists(model_path):
             return False
 
-        model_data = joblib.load(model_path)
+        model_data = joblib.load(model_path, mmap_mode=mmap_mode)
 
         self.model = model_data["model"]
         self.cat_value_dicts = model_data["cat_value_dicts"]
         self.final_colname = model_data["final_colname"]
+        self.encoding = model_data.get("encoding", "label")
+        self.multi_value_columns = tuple(
+            model_data.get("multi_value_columns", MULTI_VALUE_COLUMNS)
+        )
         self.accuracy = model_data["accuracy"]
         self.most_important_feature = model_data["most_important_feature"]
+        self.prediction_table = model_data.get("prediction_table")
+        self.training_seconds = model_data.get("training_seconds")
+        self.temperature = model_data.get("temperature")
+        self.ranking_cache.clear()
+
+        self.condition_graph = None
+        if model_data.get("condition_graph") is not None:
+            from condition_graph import ConditionGraph
+
+            self.condition_graph = ConditionGraph(model_data["condition_graph"])
+
+        feature_columns = model_data.get("feature_columns")
+        if feature_columns is None:
+            # Older artifacts don't store the schema; recover it from the estimator
+            feature_columns = getattr(self.model, "feature_names_in_", None)
+            if feature_columns is None:
+                feature_columns = [
+                    col for col in self.cat_value_dicts if col != self.final_colname
+                ]
+        if hasattr(self.model, "feature_names_in_"):
+            # Rows are encoded positionally, so skip sklearn's per-call name check
+            del self.model.feature_names_in_
+        self._build_inference_schema([str(col) for col in feature_columns])
 
         return True
 
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+
+from ml_model import HealthRecommendationModel
+
+
+class ModelRegistry:
+    """Holds the serving model and swaps it atomically when a new one loads.
+
+    Requests read ``registry.current`` once and keep using that reference,
+    so a swap never affects a request already in flight. Loading, training
+    and validation happen off to the side (optionally in a background
+    thread); only the final reference assignment touches the serving path.
+    The replaced model is kept in ``previous`` for rollback.
+    """
+
+    def __init__(self, prepare=None, mmap_mode=None):
+        self.current = None
+        self.previous = None
+        self.version = 0
+        self.source = None
+        self.previous_source = None
+        self.loaded_at = None
+        self.last_error = None
+        self.load_seconds = None
+        self.prepare = prepare
+        self.mmap_mode = mmap_mode
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def on_swap(self, callback):
+        """Register callback(model) to run after every swap or rollback"""
+        self._listeners.append(callback)
+
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+
+    def smoke_test(self, model):
+        """Predict one known-valid input; raise if the model can't serve it"""
+        sample = {}
+        for colname, encoder in zip(model.feature_columns, model.feature_encoders):
+            sample[colname] = 0.0 if encoder is None else next(iter(encoder))
+
+        result = model.predict(sample)
+        if "error" in result:
+            raise ValueError(f"Smoke prediction failed: {result['error']}")
+
+    def swap(self, model, source):
+        self.previous, self.current = self.current, model
+        self.previous_source, self.source = self.source, source
+        self.version += 1
+        self.loaded_at = time.time()
+        self._notify()
+
+    def rollback(self):
+        """Swap the previous model back in; returns False if there is none.
+
+        Waits for a running reload, so the two never interleave.
+        """
+        with self._reload_lock:
+            if self.previous is None:
+                return False
+
+            self.current, self.previous = self.previous, self.current
+            self.source, self.previous_source = self.previous_source, self.source
+            self.version += 1
+            self.loaded_at = time.time()
+            self._notify()
+            return True
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback(self.current)
+
+    def _activate(self, model, source):
+        if self.prepare is not None:
+            self.prepare(model)
+        self.smoke_test(model)
+        self.swap(model, source)
+
+    def load(self, model_path):
+        """Load, validate and swap in a model artifact. Returns True on success."""
+        with self._reload_lock:
+            return self._load(model_path)
+
+    def _load(self, model_path):
+        started = time.perf_counter()
+        try:
+            model = HealthRecommendationModel()
+            if not model.load_model(model_path, mmap_mode=self.mmap_mode):
+                raise FileNotFoundError(f"Model file not found: {model_path}")
+            self._activate(model, model_path)
+            self.last_error = None
+            self.load_seconds = time.perf_counter() - started
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error loading model from {model_path}: {e}")
+            return False
+
+    def train(self, data_path, model_path):
+        """Train from the dataset, save the artifact and swap it in"""
+        with self._reload_lock:
+            return self._train(data_path, model_path)
+
+    def _train(self, data_path, model_path):
+        try:
+            model = HealthRecommendationModel(data_path)
+            if model.model is None:
+                raise FileNotFoundError(f"Dataset not found: {data_path}")
+            model.save_model(model_path)
+            self._activate(model, model_path)
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error training model: {e}")
+            return False
+
+    def _in_background(self, target, *args):
+        """Run target in a daemon thread unless a reload is already running.
+
+        The lock is taken here, before the thread starts, so two concurrent
+        callers can't both be told a reload was started.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                target(*args)
+            finally:
+                self._reload_lock.release()
+
+        try:
+            threading.Thread(target=run, daemon=True).start()
+        except BaseException:
+            self._reload_lock.release()
+            raise
+        return True
+
+    def reload_in_background(self, model_path):
+        return self._in_background(self._load, model_path)
+
+    def train_in_background(self, data_path, model_path):
+        return self._in_background(self._train, data_path, model_path)
+
+    def watch(self, model_path, interval=5.0):
+        """Poll the artifact's mtime and reload whenever it changes.
+
+        Unlike the admin endpoint, which only reaches the worker that served
+        the request, a watcher runs in every gunicorn worker.
+        """
+        if self._watcher is not None:
+            return
+
+        def poll():
+            last_mtime = _mtime(model_path)
+            while True:
+                time.sleep(interval)
+                mtime = _mtime(model_path)
+                if mtime is not None and mtime != last_mtime:
+                    last_mtime = mtime
+                    print(f"Detected new model at {model_path}, reloading...")
+                    self.load(model_path)
+
+        self._watcher = threading.Thread(target=poll, daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "reloading": self.reloading,
+            "rollback_available": self.previous is not None,
+            "last_error": self.last_error,
+            "load_seconds": self.load_seconds,
+        }
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,120 @@
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import KFold
+
+from ml_model import HealthRecommendationModel
+
+DEFAULT_SOLVERS = ("lbfgs", "newton-cg", "saga")
+DEFAULT_C_VALUES = (0.1, 1.0, 10.0)
+DEFAULT_ENCODINGS = ("label", "multihot")
+
+
+def leaderboard_path(model_path):
+    """Where the leaderboard for a given model artifact is written"""
+    return os.path.splitext(model_path)[0] + ".leaderboard.json"
+
+
+def _evaluate_fold(x, y, train_idx, test_idx, params, latency_rows=100):
+    """Fit one candidate on one fold and time fitting and single-row predicts"""
+    model = LogisticRegression(**{"max_iter": 1000, **params})
+
+    start = time.perf_counter()
+    model.fit(x[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    x_test = x[test_idx]
+    accuracy = float((model.predict(x_test) == y[test_idx]).mean())
+
+    # Serving predicts one row at a time, so that is the latency we report
+    n_rows = min(latency_rows, x_test.shape[0])
+    start = time.perf_counter()
+    for i in range(n_rows):
+        model.predict_proba(x_test[i : i + 1])
+    predict_latency = (time.perf_counter() - start) / max(n_rows, 1)
+
+    return accuracy, fit_time, predict_latency
+
+
+def search(
+    data_path,
+    solvers=DEFAULT_SOLVERS,
+    c_values=DEFAULT_C_VALUES,
+    encodings=DEFAULT_ENCODINGS,
+    folds=5,
+    n_jobs=None,
+    random_state=42,
+):
+    """Cross-validate every (encoding, solver, C) candidate in parallel.
+
+    Each fold of each candidate is an independent job on a joblib worker
+    pool sized to the available cores. Returns the leaderboard sorted by
+    accuracy (ties broken by predict latency) and the prepared models per
+    encoding so the winner can be refit without reloading the CSV.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    kfold = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+
+    prepared = {}
+    jobs = []
+    candidates = []
+
+    for encoding in encodings:
+        model = HealthRecommendationModel(encoding=encoding)
+        model.load_and_prepare_data(data_path)
+        prepared[encoding] = model
+        x, y = model.training_data()
+
+        for solver, c_value in itertools.product(solvers, c_values):
+            params = {"solver": solver, "C": c_value}
+            candidates.append((encoding, params))
+            for train_idx, test_idx in kfold.split(y):
+                jobs.append((len(candidates) - 1, x, y, train_idx, test_idx, params))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_fold)(x, y, train_idx, test_idx, params)
+        for _, x, y, train_idx, test_idx, params in jobs
+    )
+
+    per_candidate = [[] for _ in candidates]
+    for (candidate_idx, *_), result in zip(jobs, results):
+        per_candidate[candidate_idx].append(result)
+
+    leaderboard = []
+    for (encoding, params), fold_results in zip(candidates, per_candidate):
+        accuracies, fit_times, latencies = (np.array(col) for col in zip(*fold_results))
+        leaderboard.append(
+            {
+                "encoding": encoding,
+                "params": params,
+                "accuracy": round(float(accuracies.mean()) * 100, 2),
+                "accuracy_std": round(float(accuracies.std()) * 100, 2),
+                "fit_time_s": round(float(fit_times.mean()), 4),
+                "predict_latency_us": round(float(latencies.mean()) * 1e6, 1),
+            }
+        )
+
+    leaderboard.sort(key=lambda row: (-row["accuracy"], row["predict_latency_us"]))
+    return leaderboard, prepared
+
+
+def train_best(data_path, model_path="model.joblib", **search_kwargs):
+    """Run the search, then refit and save the best candidate and leaderboard"""
+    leaderboard, prepared = search(data_path, **search_kwargs)
+    best = leaderboard[0]
+
+    model = prepared[best["encoding"]]
+    model.train_model(**best["params"])
+
+    if not model.save_model(model_path):
+        return None, leaderboard
+
+    with open(leaderboard_path(model_path), "w") as f:
+        json.dump({"best": best, "candidates": leaderboard}, f, indent=2)
+
+    return model, leaderboard
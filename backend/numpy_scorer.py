@@ -0,0 +1,90 @@
+import numpy as np
+
+from ml_model import softmax
+
+DTYPES = ("float32", "float64")
+
+
+def sigmoid(z):
+    # exp(-log(1 + exp(-z))) never overflows, unlike 1 / (1 + exp(-z))
+    return np.exp(-np.logaddexp(0, -z))
+
+
+def _is_multinomial(estimator):
+    """Whether sklearn turns this linear model's scores into probabilities with softmax"""
+    if isinstance(estimator, NumpyScorer):
+        return estimator.multinomial
+    if type(estimator).__name__ != "LogisticRegression":
+        # SGDClassifier and friends are one-vs-rest
+        return False
+    if getattr(estimator, "multi_class", "auto") == "ovr":
+        return False
+    return getattr(estimator, "solver", "lbfgs") != "liblinear"
+
+
+class NumpyScorer:
+    """A trained linear classifier scored with plain NumPy.
+
+    Mirrors the parts of the sklearn estimator API the model uses
+    (``classes_``, ``coef_``, ``intercept_``, ``decision_function``,
+    ``predict_proba`` and ``predict``), so it can stand in for the
+    estimator. Scoring one row is a matrix product and a softmax, without
+    sklearn's per-call input validation. Unpickling it needs only numpy.
+    """
+
+    def __init__(self, coef, intercept, classes, multinomial=True, dtype="float32"):
+        if np.dtype(dtype).name not in DTYPES:
+            raise ValueError(f"Unsupported scorer dtype: {dtype}")
+
+        self.dtype = np.dtype(dtype)
+        self.coef_ = np.ascontiguousarray(coef, dtype=self.dtype)
+        self.intercept_ = np.asarray(intercept, dtype=self.dtype)
+        self.classes_ = np.asarray(classes)
+        self.multinomial = multinomial
+        # Transposed once so scoring is a single x @ weights
+        self._weights = np.ascontiguousarray(self.coef_.T)
+
+    @classmethod
+    def from_estimator(cls, estimator, dtype="float32"):
+        return cls(
+            estimator.coef_,
+            estimator.intercept_,
+            estimator.classes_,
+            multinomial=_is_multinomial(estimator),
+            dtype=dtype,
+        )
+
+    def decision_function(self, x):
+        if hasattr(x, "tocsr"):
+            # scipy sparse design matrix (multi-hot encoding)
+            scores = x.astype(self.dtype) @ self._weights
+        else:
+            scores = np.asarray(x, dtype=self.dtype)
+            if scores.ndim == 1:
+                scores = scores.reshape(1, -1)
+            scores = scores @ self._weights
+
+        scores += self.intercept_
+        # Binary models have a single score column, like sklearn's 1-D output
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, x):
+        scores = self.decision_function(x)
+
+        if scores.ndim == 1:
+            positive = sigmoid(scores)
+            return np.column_stack([1 - positive, positive])
+
+        if self.multinomial:
+            return softmax(scores)
+
+        # One-vs-rest: independent sigmoids, normalized to sum to one
+        proba = sigmoid(scores)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict(self, x):
+        scores = self.decision_function(x)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(np.intp)]
+        return self.classes_[scores.argmax(axis=1)]
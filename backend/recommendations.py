@@ -0,0 +1,161 @@
+import csv
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from ml_model import split_value
+
+GUIDE_TITLE_PREFIX = "Understanding and Managing "
+
+Recommendation = namedtuple("Recommendation", ["first_aid", "related", "guides"])
+
+
+def condition_key(name):
+    """Case- and whitespace-insensitive lookup key for a condition name"""
+    return str(name).strip().casefold()
+
+
+def _ranked(counts, limit):
+    """Most frequent values first; ties keep their order of first appearance"""
+    return tuple(value for value, _ in sorted(counts.items(), key=lambda kv: -kv[1])[:limit])
+
+
+def dataset_counts(data_path):
+    """(first_aid, related) counts per condition key from the dataset CSV.
+
+    First aid comes from the ``obat_pertolongan_pertama`` column, counted
+    both under ``nama_penyakit`` and under the ``penyakit_perkembangan``
+    outcome the model predicts. ``related`` links the two: the likely
+    progressions of a disease, or the diseases that lead to an outcome.
+    Parsed with the csv module so serving never has to import pandas.
+    """
+    first_aid = {}
+    related = {}
+
+    with open(data_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            disease = row["nama_penyakit"]
+            outcome = row["penyakit_perkembangan"]
+            tokens = split_value(row["obat_pertolongan_pertama"])
+
+            for condition in (disease, outcome):
+                if not condition:
+                    continue
+                counts = first_aid.setdefault(condition_key(condition), {})
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+
+            if disease and outcome:
+                for condition, other in ((disease, outcome), (outcome, disease)):
+                    counts = related.setdefault(condition_key(condition), {})
+                    counts[other] = counts.get(other, 0) + 1
+
+    return first_aid, related
+
+
+def guide_lists(engine):
+    """Rows of the ``guides`` table per condition key"""
+    from sqlalchemy import text
+
+    guides = {}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT id, title, description, category FROM guides ORDER BY id")
+        ).mappings()
+        for row in rows:
+            title = row["title"]
+            condition = title[len(GUIDE_TITLE_PREFIX):] if title.startswith(GUIDE_TITLE_PREFIX) else title
+            guides.setdefault(condition_key(condition), []).append(MappingProxyType(dict(row)))
+    return guides
+
+
+def build_index(first_aid, related, guides, limit=5):
+    """Build an immutable condition -> Recommendation mapping"""
+    index = {}
+    for key in set(first_aid) | set(related) | set(guides):
+        index[key] = Recommendation(
+            first_aid=_ranked(first_aid.get(key, {}), limit),
+            related=_ranked(related.get(key, {}), limit),
+            guides=tuple(guides.get(key, ())),
+        )
+
+    return MappingProxyType(index)
+
+
+class RecommendationStore:
+    """Serves first-aid recommendations from an in-memory index.
+
+    The index is built in a background thread at start-up and optionally
+    rebuilt on an interval; lookups are a single dict access and never hit
+    the database. The dataset and the guides table are loaded separately:
+    if one fails, the other is still used and the failed half keeps its
+    previous contents. A rebuild swaps in a whole new immutable index, so
+    readers never see a half-built one.
+    """
+
+    def __init__(self, data_path=None, engine_getter=None):
+        self.data_path = data_path
+        self.engine_getter = engine_getter
+        self._index = MappingProxyType({})
+        self._dataset = ({}, {})
+        self._guides = {}
+        self.loaded_at = None
+        self.last_error = None
+        self._listeners = []
+        self._loader = None
+
+    def on_refresh(self, callback):
+        self._listeners.append(callback)
+
+    def load(self):
+        """Rebuild the index; returns False if either half failed to load"""
+        errors = []
+
+        if self.data_path is not None:
+            try:
+                self._dataset = dataset_counts(self.data_path)
+            except Exception as e:
+                errors.append(f"dataset: {e}")
+
+        try:
+            engine = self.engine_getter() if self.engine_getter else None
+            if engine is not None:
+                self._guides = guide_lists(engine)
+        except Exception as e:
+            errors.append(f"guides: {e}")
+
+        self._index = build_index(*self._dataset, self._guides)
+        self.loaded_at = time.time()
+        self.last_error = "; ".join(errors) or None
+        if errors:
+            print(f"Error loading recommendations: {self.last_error}")
+
+        for callback in self._listeners:
+            callback()
+        return not errors
+
+    def get(self, condition):
+        return self._index.get(condition_key(condition))
+
+    def start(self, interval=0):
+        """Load in a background thread, then reload every ``interval`` seconds if positive"""
+        if self._loader is not None:
+            return
+
+        def run():
+            self.load()
+            while interval > 0:
+                time.sleep(interval)
+                self.load()
+
+        self._loader = threading.Thread(target=run, daemon=True)
+        self._loader.start()
+
+    def stats(self):
+        return {
+            "conditions": len(self._index),
+            "guides": sum(len(guides) for guides in self._guides.values()),
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
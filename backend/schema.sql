@@ -38,6 +38,12 @@ CREATE TABLE IF NOT EXISTS guides (
   updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Keyset pagination indexes for the /api/posts and /api/guides list views
+CREATE INDEX IF NOT EXISTS blog_posts_created_at_id_idx ON blog_posts (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS blog_posts_category_created_at_id_idx
+  ON blog_posts (category, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS guides_created_at_id_idx ON guides (created_at DESC, id DESC);
+
 -- Saved guides table (for users to bookmark guides)
 CREATE TABLE IF NOT EXISTS saved_guides (
   id SERIAL PRIMARY KEY,
@@ -47,6 +53,21 @@ CREATE TABLE IF NOT EXISTS saved_guides (
   UNIQUE(user_id, guide_id)
 );
 
+-- Natural key for seed_database.py upserts. Older seeders inserted every
+-- guide again on each run, so collapse duplicate titles onto the lowest id
+-- first (moving bookmarks to the guide that is kept); seed_database.py runs
+-- the same steps.
+INSERT INTO saved_guides (user_id, guide_id)
+SELECT DISTINCT s.user_id, k.keep_id
+FROM saved_guides s
+JOIN guides g ON g.id = s.guide_id
+JOIN (SELECT title, min(id) AS keep_id FROM guides GROUP BY title) k ON k.title = g.title
+WHERE s.guide_id <> k.keep_id
+ON CONFLICT (user_id, guide_id) DO NOTHING;
+DELETE FROM saved_guides WHERE guide_id NOT IN (SELECT min(id) FROM guides GROUP BY title);
+DELETE FROM guides WHERE id NOT IN (SELECT min(id) FROM guides GROUP BY title);
+CREATE UNIQUE INDEX IF NOT EXISTS guides_title_key ON guides (title);
+
 -- Diagnosis history table
 CREATE TABLE IF NOT EXISTS diagnosis_history (
   id SERIAL PRIMARY KEY,
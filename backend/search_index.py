@@ -0,0 +1,181 @@
+import re
+
+import numpy as np
+
+NGRAM_SIZE = 3
+# Minimum trigram similarity for a value to count as a typo of the query
+MIN_SIMILARITY = 0.3
+# Stricter bar for silently replacing a diagnose input
+MIN_RESOLVE_SIMILARITY = 0.5
+# ...which must also beat the runner-up by this much, or it is ambiguous
+MIN_RESOLVE_MARGIN = 0.1
+MAX_SUGGESTIONS = 5
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(value):
+    return _WHITESPACE.sub(" ", str(value).strip().casefold())
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """Character n-grams of text padded with spaces, so word edges count"""
+    padded = f" {text} "
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+class SearchIndex:
+    """Autocomplete and typo-tolerant lookup over categorical feature values.
+
+    Two structures are built once per model: a prefix trie over every value
+    and every word start within it (so "payu" finds "Kanker Payudara"), and
+    an inverted index from character trigrams to values for fuzzy matches.
+    Each trie node keeps its completions pre-sorted, so a prefix query is a
+    walk down the trie plus a slice.
+    """
+
+    def __init__(self, values_by_column):
+        # entries[i] = (column, value, normalized value)
+        self.entries = []
+        self._trie = {}
+        self._grams = {}
+        self._gram_counts = []
+        self._exact = {}
+
+        for column, values in values_by_column.items():
+            for value in values:
+                if isinstance(value, str) and value.strip():
+                    self._add(column, value)
+
+        self._sort_completions(self._trie)
+        # Posting lists as arrays so shared trigrams are counted with bincount
+        self._grams = {gram: np.array(ids, dtype=np.int32) for gram, ids in self._grams.items()}
+        self._gram_counts = np.array(self._gram_counts, dtype=np.float64)
+        self._columns = np.array([column for column, _, _ in self.entries], dtype=object)
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(model.get_feature_options())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, column, value):
+        entry_id = len(self.entries)
+        text = normalize(value)
+        self.entries.append((column, value, text))
+        self._exact.setdefault((column, text), value)
+
+        # Whole-value prefixes rank above prefixes of a later word
+        starts = [0] + [m.end() for m in re.finditer(" ", text)]
+        for rank, start in enumerate(starts):
+            node = self._trie
+            for char in text[start:]:
+                node = node.setdefault(char, {})
+                node.setdefault(None, []).append((min(rank, 1), len(text), text, entry_id))
+
+        grams = ngrams(text)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(entry_id)
+
+    def _sort_completions(self, node):
+        for key, child in node.items():
+            if key is None:
+                # A value can reach a node through several word starts
+                seen = set()
+                ordered = []
+                for item in sorted(child):
+                    if item[3] not in seen:
+                        seen.add(item[3])
+                        ordered.append(item[3])
+                node[None] = ordered
+            else:
+                self._sort_completions(child)
+
+    def prefix_matches(self, query):
+        node = self._trie
+        for char in normalize(query):
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get(None, [])
+
+    def fuzzy_matches(self, query, min_similarity=MIN_SIMILARITY, column=None, limit=None):
+        """Best (entry id, Dice similarity) pairs sharing enough trigrams with query"""
+        grams = ngrams(normalize(query))
+        postings = [self._grams[gram] for gram in grams if gram in self._grams]
+        if not postings:
+            return []
+
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.entries))
+        similarity = 2 * shared / (len(grams) + self._gram_counts)
+        if column is not None:
+            similarity[self._columns != column] = 0
+        candidates = np.flatnonzero(similarity >= min_similarity)
+
+        # Only the top `limit` candidates need a full sort. Everything tied
+        # with the last of them is kept, so the cut doesn't depend on
+        # argpartition's arbitrary order among ties.
+        if limit is not None and len(candidates) > limit:
+            cutoff = -np.partition(-similarity[candidates], limit - 1)[limit - 1]
+            candidates = candidates[similarity[candidates] >= cutoff]
+
+        matches = [(int(entry_id), float(similarity[entry_id])) for entry_id in candidates]
+        matches.sort(key=lambda match: (-match[1], self.entries[match[0]][2]))
+        return matches[:limit]
+
+    def search(self, query, limit=10, column=None):
+        """Prefix matches first, then typo-tolerant ones, best first"""
+        results = []
+        seen = set()
+
+        def add(entry_id, match, score):
+            entry_column, value, _ = self.entries[entry_id]
+            if entry_id in seen or (column is not None and entry_column != column):
+                return
+            seen.add(entry_id)
+            results.append(
+                {"value": value, "column": entry_column, "match": match, "score": round(score, 3)}
+            )
+
+        text = normalize(query)
+        if not text:
+            return results
+
+        for entry_id in self.prefix_matches(text):
+            if len(results) >= limit:
+                return results
+            add(entry_id, "prefix", len(text) / len(self.entries[entry_id][2]))
+
+        # Ask for enough extra matches to cover values already found by prefix
+        fuzzy = self.fuzzy_matches(text, column=column, limit=limit + len(results))
+        for entry_id, similarity in fuzzy:
+            if len(results) >= limit:
+                break
+            add(entry_id, "fuzzy", similarity)
+
+        return results
+
+    def resolve(self, column, value, min_similarity=MIN_RESOLVE_SIMILARITY, min_margin=MIN_RESOLVE_MARGIN):
+        """Closest known value of column for a near-miss input.
+
+        Returns (value, []) for an exact match or a clear best one. If other
+        values score within ``min_margin`` of the best, the input is
+        ambiguous and (None, candidates) is returned, best first; (None, [])
+        means nothing is similar enough.
+        """
+        text = normalize(value)
+        exact = self._exact.get((column, text))
+        if exact is not None:
+            return exact, []
+
+        matches = self.fuzzy_matches(text, min_similarity, column=column)
+        if not matches:
+            return None, []
+
+        best = matches[0][1]
+        close = [entry_id for entry_id, similarity in matches if best - similarity < min_margin]
+        if len(close) == 1:
+            return self.entries[close[0]][1], []
+        return None, [self.entries[entry_id][1] for entry_id in close[:MAX_SUGGESTIONS]]
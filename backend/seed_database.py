@@ -1,94 +1,232 @@
-import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine
+"""Seed the guides table with one guide per condition in the dataset.
+
+Rows are upserted on their title in multi-row INSERT batches, all inside one
+transaction, so re-running the seeder only touches guides whose content
+changed. Without DATABASE_URL it seeds a local SQLite file instead.
+
+    python seed_database.py --chunk-size 500
+"""
+import argparse
 import os
+import time
+
+import pandas as pd
 from dotenv import load_dotenv
-import json
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    func,
+    or_,
+    text,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from recommendations import GUIDE_TITLE_PREFIX
 
 # Load environment variables
 load_dotenv()
 
-# Database connection
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+DATA_PATH = "dataset_penyakit_10000_cleaned.csv"
+SQLITE_FALLBACK_URL = "sqlite:///seed.db"
+
+metadata = MetaData()
+
+guides_table = Table(
+    "guides",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", Text, nullable=False, unique=True),
+    Column("description", Text, nullable=False),
+    Column("content", JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=False),
+    Column("category", Text, nullable=False),
+    Column("difficulty", Text, nullable=False),
+    Column("time", Text),
+    Column("image_url", Text),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+# Columns compared on conflict; the row is only rewritten if one differs
+SEEDED_COLUMNS = ("description", "content", "category", "difficulty", "time", "image_url")
+
+# Older seeders inserted every guide again on each run. Before the unique
+# index on title can exist, duplicates are collapsed onto the lowest id,
+# moving users' bookmarks to the guide that is kept.
+DEDUPE_GUIDES = (
+    """
+    INSERT INTO saved_guides (user_id, guide_id)
+    SELECT DISTINCT s.user_id, k.keep_id
+    FROM saved_guides s
+    JOIN guides g ON g.id = s.guide_id
+    JOIN (SELECT title, min(id) AS keep_id FROM guides GROUP BY title) k ON k.title = g.title
+    WHERE s.guide_id <> k.keep_id
+    ON CONFLICT (user_id, guide_id) DO NOTHING
+    """,
+    "DELETE FROM saved_guides WHERE guide_id NOT IN (SELECT min(id) FROM guides GROUP BY title)",
+    "DELETE FROM guides WHERE id NOT IN (SELECT min(id) FROM guides GROUP BY title)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS guides_title_key ON guides (title)",
+)
+
+INSERT_BUILDERS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def build_guides(conditions):
+    guides = []
+    for i, condition in enumerate(conditions):
+        # Create a guide for each condition
+        guide = {
+            "title": f"{GUIDE_TITLE_PREFIX}{condition}",
+            "description": f"A comprehensive guide to understanding, identifying, and managing {condition}.",
+            "content": {
+                "steps": [
+                    {
+                        "title": f"Recognizing {condition}",
+                        "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
+                    },
+                    {
+                        "title": "When to Seek Medical Help",
+                        "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
+                    },
+                    {
+                        "title": "Home Management",
+                        "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
+                    },
+                    {
+                        "title": "Prevention Tips",
+                        "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
+                    },
+                ],
+                "tips": [
+                    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+                    "Nullam euismod, nisl eget aliquam ultricies.",
+                    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+                    "Nullam euismod, nisl eget aliquam ultricies.",
+                ],
+                "warnings": [
+                    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+                    "Nullam euismod, nisl eget aliquam ultricies.",
+                ],
+            },
+            "category": (
+                "Health Condition"
+                if i % 3 == 0
+                else ("First Aid" if i % 3 == 1 else "Preventive Care")
+            ),
+            "difficulty": (
+                "Beginner"
+                if i % 3 == 0
+                else ("Intermediate" if i % 3 == 1 else "Advanced")
+            ),
+            "time": f"{(i % 5) * 5 + 5} minutes",
+            "image_url": f"/placeholder.svg?height=400&width=800&text={condition}",
+        }
+        guides.append(guide)
 
+    return guides
 
-def seed_database():
+
+def ensure_title_key(engine):
+    """Dedupe guides by title and create the unique index the upsert needs"""
+    with engine.begin() as conn:
+        for statement in DEDUPE_GUIDES:
+            conn.execute(text(statement))
+
+
+def upsert_statement(engine):
+    """INSERT ... ON CONFLICT (title) DO UPDATE that skips unchanged rows"""
+    insert = INSERT_BUILDERS.get(engine.dialect.name)
+    if insert is None:
+        raise ValueError(f"Upserts are not supported on {engine.dialect.name}")
+
+    stmt = insert(guides_table)
+    excluded = stmt.excluded
+    changed = or_(
+        *(guides_table.c[name].is_distinct_from(excluded[name]) for name in SEEDED_COLUMNS)
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[guides_table.c.title],
+        set_={**{name: excluded[name] for name in SEEDED_COLUMNS}, "updated_at": func.now()},
+        where=changed,
+    )
+
+
+def bulk_upsert(engine, rows, chunk_size=500):
+    """Upsert rows in multi-values batches inside a single transaction.
+
+    Returns the number of rows inserted or updated; rows identical to what
+    is already stored count as unchanged.
+    """
+    stmt = upsert_statement(engine)
+    written = 0
+    with engine.begin() as conn:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            # One multi-row VALUES list per chunk instead of one INSERT per row
+            result = conn.execute(stmt.values(chunk))
+            written += max(result.rowcount, 0)
+
+    return written
+
+
+def seed_database(data_path=DATA_PATH, database_url=None, chunk_size=500):
     print("Starting database seeding...")
 
+    database_url = database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        database_url = SQLITE_FALLBACK_URL
+        print(f"DATABASE_URL is not set, seeding {database_url}")
+    engine = create_engine(database_url)
+
     try:
+        if engine.dialect.name == "sqlite":
+            # Postgres gets its tables from schema.sql
+            metadata.create_all(engine)
+        else:
+            # Databases seeded before the unique index existed need deduping
+            ensure_title_key(engine)
+
         # Load dataset
-        data = pd.read_csv("dataset_penyakit_10000_cleaned.csv")
+        data = pd.read_csv(data_path)
         print(f"Loaded dataset with {len(data)} rows and {len(data.columns)} columns")
 
         # Get unique conditions (last column)
         conditions = data.iloc[:, -1].unique()
         print(f"Found {len(conditions)} unique health conditions")
 
-        # Create guides for each condition
-        guides = []
-        for i, condition in enumerate(conditions):
-            # Create a guide for each condition
-            guide = {
-                "title": f"Understanding and Managing {condition}",
-                "description": f"A comprehensive guide to understanding, identifying, and managing {condition}.",
-                "content": json.dumps(
-                    {
-                        "steps": [
-                            {
-                                "title": f"Recognizing {condition}",
-                                "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
-                            },
-                            {
-                                "title": "When to Seek Medical Help",
-                                "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
-                            },
-                            {
-                                "title": "Home Management",
-                                "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
-                            },
-                            {
-                                "title": "Prevention Tips",
-                                "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam euismod, nisl eget aliquam ultricies.",
-                            },
-                        ],
-                        "tips": [
-                            "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
-                            "Nullam euismod, nisl eget aliquam ultricies.",
-                            "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
-                            "Nullam euismod, nisl eget aliquam ultricies.",
-                        ],
-                        "warnings": [
-                            "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
-                            "Nullam euismod, nisl eget aliquam ultricies.",
-                        ],
-                    }
-                ),
-                "category": (
-                    "Health Condition"
-                    if i % 3 == 0
-                    else ("First Aid" if i % 3 == 1 else "Preventive Care")
-                ),
-                "difficulty": (
-                    "Beginner"
-                    if i % 3 == 0
-                    else ("Intermediate" if i % 3 == 1 else "Advanced")
-                ),
-                "time": f"{(i % 5) * 5 + 5} minutes",
-                "image_url": f"/placeholder.svg?height=400&width=800&text={condition}",
-            }
-            guides.append(guide)
-
-        # Insert guides into database
-        guides_df = pd.DataFrame(guides)
-        guides_df.to_sql("guides", engine, if_exists="append", index=False)
-        print(f"Inserted {len(guides)} guides into the database")
+        guides = build_guides(conditions)
+
+        start = time.perf_counter()
+        written = bulk_upsert(engine, guides, chunk_size)
+        elapsed = time.perf_counter() - start
+
+        rate = len(guides) / elapsed if elapsed else float("inf")
+        print(
+            f"Upserted {len(guides)} guides in {elapsed:.3f}s ({rate:.0f} rows/s): "
+            f"{written} written, {len(guides) - written} unchanged"
+        )
 
         print("Database seeding completed successfully!")
 
     except Exception as e:
         print(f"Error seeding database: {e}")
+    finally:
+        engine.dispose()
 
 
 if __name__ == "__main__":
-    seed_database()
+    parser = argparse.ArgumentParser(description="Seed the guides table")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL, then SQLite")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    seed_database(args.data, args.database_url, args.chunk_size)
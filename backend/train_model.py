@@ -1,24 +1,134 @@
 from ml_model import HealthRecommendationModel
+import model_search
+import argparse
 import os
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the health recommendation model")
+    parser.add_argument("--data", default="dataset_penyakit_10000_cleaned.csv")
+    parser.add_argument("--output", default="model.joblib")
+    parser.add_argument(
+        "--encoding",
+        choices=["label", "multihot"],
+        default="label",
+        help="'multihot' splits comma-separated columns into sparse token features",
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Fit a softmax temperature on the holdout to calibrate confidences",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read the CSV in chunks and train incrementally (constant memory)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Cross-validate a grid of solvers, C values and encodings in parallel",
+    )
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--solvers", default=",".join(model_search.DEFAULT_SOLVERS))
+    parser.add_argument("--c-values", default=",".join(str(c) for c in model_search.DEFAULT_C_VALUES))
+    parser.add_argument("--encodings", default=",".join(model_search.DEFAULT_ENCODINGS))
+    parser.add_argument(
+        "--prediction-table-mb",
+        type=float,
+        default=0,
+        help="Precompute and save a prediction table if it fits in this many MB",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse and encode the CSV even if an encoded copy is cached",
+    )
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--holdout-size", type=int, default=10000)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument(
+        "--export-scorer",
+        metavar="PATH",
+        help="Also save an artifact that scores with NumPy only (no sklearn at serve time)",
+    )
+    parser.add_argument("--scorer-dtype", choices=["float32", "float64"], default="float32")
+    args = parser.parse_args()
+
+    if args.stream and args.encoding != "label":
+        parser.error("--stream only supports --encoding label")
+    return args
+
+def run_search(args):
+    model, leaderboard = model_search.train_best(
+        args.data,
+        args.output,
+        solvers=args.solvers.split(","),
+        c_values=[float(c) for c in args.c_values.split(",")],
+        encodings=args.encodings.split(","),
+        folds=args.folds,
+        n_jobs=args.jobs,
+    )
+
+    print(f"{'encoding':<10} {'solver':<10} {'C':>6} {'acc %':>7} {'fit s':>8} {'predict us':>11}")
+    for row in leaderboard:
+        print(
+            f"{row['encoding']:<10} {row['params']['solver']:<10} {row['params']['C']:>6} "
+            f"{row['accuracy']:>7} {row['fit_time_s']:>8} {row['predict_latency_us']:>11}"
+        )
+
+    if model is None:
+        print("Failed to save model.")
+        return
+
+    print(f"Best model trained with {model.accuracy}% accuracy.")
+    print(f"Model saved to '{args.output}'")
+    print(f"Leaderboard saved to '{model_search.leaderboard_path(args.output)}'")
+
 def main():
+    args = parse_args()
     print("Starting model training...")
 
     # Check if dataset exists
-    if not os.path.exists("dataset_penyakit_10000_cleaned.csv"):
-        print("Dataset not found. Please place 'dataset_penyakit_10000_cleaned.csv' in the current directory.")
+    if not os.path.exists(args.data):
+        print(f"Dataset not found. Please place '{args.data}' in the current directory.")
+        return
+
+    if args.search:
+        run_search(args)
         return
 
     # Initialize and train the model
-    model = HealthRecommendationModel("dataset_penyakit_10000_cleaned.csv")
+    if args.stream:
+        model = HealthRecommendationModel(encoding=args.encoding)
+        model.train_streaming(
+            args.data,
+            chunksize=args.chunksize,
+            holdout_size=args.holdout_size,
+            epochs=args.epochs,
+        )
+    else:
+        model = HealthRecommendationModel(encoding=args.encoding)
+        model.load_and_prepare_data(args.data, use_cache=not args.no_cache)
+        model.train_model(calibrate=args.calibrate)
+
+    if args.prediction_table_mb > 0:
+        if model.build_prediction_table(max_bytes=int(args.prediction_table_mb * 1024 * 1024)):
+            print("Prediction table built and saved with the model.")
+        else:
+            print("Prediction table exceeds the memory budget, skipping.")
 
     # Save the trained model
-    if model.save_model("model.joblib"):
+    if model.save_model(args.output):
         print(f"Model trained successfully with {model.accuracy}% accuracy.")
         print(f"Most important feature: {model.most_important_feature}")
-        print("Model saved to 'model.joblib'")
+        print(f"Model saved to '{args.output}'")
     else:
         print("Failed to save model.")
+        return
+
+    if args.export_scorer and model.export_scorer(args.export_scorer, dtype=args.scorer_dtype):
+        print(f"NumPy scorer ({args.scorer_dtype}) saved to '{args.export_scorer}'")
 
 if __name__ == "__main__":
     main()
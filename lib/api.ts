@@ -3,19 +3,26 @@
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:5000/api"
 
 /**
- * Fetch blog posts with optional filtering
+ * Fetch blog posts with optional filtering.
+ *
+ * Pages are keyset-paginated: pass the previous response's `next_cursor`
+ * as `cursor` to get the next page (it is null on the last one).
  */
 export async function fetchBlogPosts(
   options: {
-    page?: number
+    cursor?: string
     perPage?: number
     category?: string
     search?: string
   } = {},
 ) {
-  const { page = 1, perPage = 10, category, search } = options
+  const { cursor, perPage = 10, category, search } = options
 
-  let url = `${API_URL}/posts?page=${page}&per_page=${perPage}`
+  let url = `${API_URL}/posts?limit=${perPage}`
+
+  if (cursor) {
+    url += `&cursor=${encodeURIComponent(cursor)}`
+  }
 
   if (category) {
     url += `&category=${encodeURIComponent(category)}`